@@ -0,0 +1,15 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Arguments holds the command line value parsers shared by the entry points
+
+import argparse
+
+
+def parse_bool(text):
+    """ Parse a yes/no command line value """
+    if text.upper() in ["Y", "YES", "TRUE", "1"]:
+        return True
+    if text.upper() in ["N", "NO", "FALSE", "0"]:
+        return False
+    raise argparse.ArgumentTypeError("expected Y or N, not " + text)
@@ -0,0 +1,215 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# BatchModel class plays many games of the Model's Blackjack in lockstep
+
+import numpy as np
+import RandomStream
+
+# value of every entry of Hand.card, an ace counts as 11 until it has to be reduced
+CARD_VALUES = np.array([2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11], dtype=np.int64)
+
+# most cards a hand can be dealt: every card adds at least 1, so the player is bust by the 22nd card and the
+# dealer, who stops at 17, never takes more than 17
+PLAYER_DEPTH = 22
+DEALER_DEPTH = 17
+
+
+def card_streams(num_games, rng):
+    """
+    Pre-generate every card the games of a batch could be dealt, for BatchModel's cards argument
+    :param num_games: number of games
+    :param rng: RandomStream the cards are drawn from
+    :return: (player cards, dealer cards), int8 arrays of card values shaped (num_games, depth)
+    """
+    values = CARD_VALUES.astype(np.int8)
+    player = values[rng.generator.integers(0, len(CARD_VALUES), (num_games, PLAYER_DEPTH))]
+    dealer = values[rng.generator.integers(0, len(CARD_VALUES), (num_games, DEALER_DEPTH))]
+    return player, dealer
+
+
+##############################################################################
+# BATCH MODEL CLASS                                                          #
+##############################################################################
+class BatchModel:
+    """
+    This class holds a batch of Blackjack games as arrays, one entry per game, and steps them all together
+    with the same rules and rewards as Model
+
+    Constructor takes:
+    num_games = how many games are played at once
+    rng = RandomStream the cards are drawn from, a new unseeded stream if not given
+    cards = optional (player cards, dealer cards) arrays of card values, as made by card_streams. Every game then
+            deals its player and dealer hands in order from its own row instead of drawing from rng, so batches
+            given the same cards play the same deal whatever actions are taken
+    """
+
+    def __init__(self, num_games, rng=None, cards=None):
+        """ Constructor """
+        self.numGames = num_games
+        self.rng = rng if rng is not None else RandomStream.RandomStream()
+        self.cards = cards
+        self.start()
+
+    def start(self):
+        """ Reinitializes every game of the batch """
+        n = self.numGames
+
+        # player hand: sum, aces still counted as 11, number of cards, double-down flag and bust flag
+        self.playerSum = np.zeros(n, dtype=np.int64)
+        self.playerAces = np.zeros(n, dtype=np.int64)
+        self.playerCards = np.zeros(n, dtype=np.int64)
+        self.doubleDown = np.zeros(n, dtype=bool)
+        self.playerBust = np.zeros(n, dtype=bool)
+
+        # dealer hand: sum, usable aces, number of cards, first card value and bust flag
+        self.dealerSum = np.zeros(n, dtype=np.int64)
+        self.dealerAces = np.zeros(n, dtype=np.int64)
+        self.dealerCards = np.zeros(n, dtype=np.int64)
+        self.dealerBust = np.zeros(n, dtype=bool)
+
+        # every game is running and it's the player's turn
+        self.isRunning = np.ones(n, dtype=bool)
+        self.playerTurn = np.ones(n, dtype=bool)
+
+        # add one card for the dealer, and two for the player
+        everyone = np.ones(n, dtype=bool)
+        self.add_dealer_card(everyone)
+        self.dealerFirst = self.dealerSum.copy()
+        self.add_player_card(everyone)
+        self.add_player_card(everyone)
+
+    def draw(self, count):
+        """
+        Draw random cards
+        :param count: how many cards to draw
+        :return: array of card values
+        """
+        return CARD_VALUES[self.rng.generator.integers(0, len(CARD_VALUES), count)]
+
+    def add_card(self, hand_sum, aces, mask, stream=None, dealt=None):
+        """
+        Add one card to the hands selected by mask, in place, the same way Hand.update_sum does
+        :param hand_sum: array of hand sums
+        :param aces: array of aces counted as 11
+        :param mask: boolean array of the games receiving a card
+        :param stream: optional array of the pre-generated cards of the hands, one row per game
+        :param dealt: array of the cards already dealt to the hands, where each game is along its row of stream
+        :return: boolean array, True for the games whose hand is now bust
+        """
+        idx = np.flatnonzero(mask)
+        if stream is None:
+            values = self.draw(len(idx))
+        else:
+            values = stream[idx, dealt[idx]]
+        new_sum = hand_sum[idx] + values
+        new_aces = aces[idx] + (values == 11)
+
+        # if we have busted, see if we have an ace that we can use
+        over = (new_sum > 21) & (new_aces > 0)
+        while np.any(over):
+            new_sum[over] -= 10
+            new_aces[over] -= 1
+            over = (new_sum > 21) & (new_aces > 0)
+
+        hand_sum[idx] = new_sum
+        aces[idx] = new_aces
+
+        bust = np.zeros(self.numGames, dtype=bool)
+        bust[idx] = new_sum > 21
+        return bust
+
+    def add_player_card(self, mask):
+        """ Add one card to the player hands selected by mask """
+        stream = self.cards[0] if self.cards is not None else None
+        bust = self.add_card(self.playerSum, self.playerAces, mask, stream, self.playerCards)
+        self.playerCards[mask] += 1
+        self.playerBust |= bust
+        return bust
+
+    def add_dealer_card(self, mask):
+        """ Add one card to the dealer hands selected by mask """
+        stream = self.cards[1] if self.cards is not None else None
+        bust = self.add_card(self.dealerSum, self.dealerAces, mask, stream, self.dealerCards)
+        self.dealerCards[mask] += 1
+        self.dealerBust |= bust
+        return bust
+
+    def do_player_action(self, actions, mask=None):
+        """
+        Does one player action in every game still on the player's turn
+        :param actions: array (or a single value) of actions, 0 means hit, 1 means stand, 2 means double-down
+        :param mask: optional boolean array restricting which games act
+        """
+        active = self.isRunning & self.playerTurn & ~self.playerBust
+        if mask is not None:
+            active &= mask
+        actions = np.broadcast_to(actions, active.shape)
+
+        stand = active & (actions == 1)
+        double_down = active & (actions == 2)
+
+        # hit and double down both draw a card
+        bust = self.add_player_card(active & ((actions == 0) | double_down))
+        self.doubleDown |= double_down
+
+        # if player hand is bust the game is over
+        self.isRunning &= ~bust
+
+        # stand, double down and bust all end the turn
+        self.playerTurn &= ~(stand | double_down | bust)
+
+    def do_dealer_action(self):
+        """ Do one dealer action in every game where it's the dealer's turn """
+        active = ~self.playerTurn & self.isRunning & ~self.dealerBust
+
+        # the first action always hits to emulate one face down card
+        first = active & (self.dealerCards == 1)
+
+        # hit on <17, Model's soft 17 test never fires so the dealer stands on every 17
+        hit = active & ~first & (self.dealerSum < 17)
+        stand = active & ~first & ~hit
+
+        self.add_dealer_card(first)
+        bust = self.add_dealer_card(hit)
+        self.isRunning &= ~(bust | stand)
+
+    def play_dealer(self):
+        """ Play out the dealer hand of every game that is waiting on the dealer """
+        while np.any(~self.playerTurn & self.isRunning):
+            self.do_dealer_action()
+
+    def get_reward(self):
+        """
+        Calculate the reward of every game, with the same rules as Model.get_reward
+        :return: array of rewards, 0 for draws and games still running
+        """
+        multiplier = np.where(self.doubleDown, 2.0, 1.0)
+        player_21 = self.playerSum == 21
+        dealer_21 = self.dealerSum == 21
+
+        conditions = [self.isRunning,
+                      player_21 & dealer_21,
+                      player_21,
+                      dealer_21,
+                      self.dealerBust,
+                      self.playerBust,
+                      self.dealerSum > self.playerSum,
+                      self.dealerSum < self.playerSum]
+        rewards = [0.0,
+                   0.0,
+                   1.5 * multiplier,
+                   -multiplier,
+                   multiplier,
+                   -multiplier,
+                   -multiplier,
+                   multiplier]
+        return np.select(conditions, rewards, 0.0)
+
+    def get_state_rl(self):
+        """
+        Get the game state representation for the RL algorithm
+        :return: arrays of player elements and dealer elements, as Model.get_state_rl gives per game
+        """
+        player_element = self.playerSum + np.where(self.playerAces > 0, 100, 0)
+        return player_element, self.dealerFirst
@@ -0,0 +1,194 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Benchmark measures training and evaluation throughput of every algorithm configuration
+# and keeps the results in a JSON history to catch regressions between releases
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import Controller
+import Evaluator
+import ModelFactory
+import RandomStream
+
+AI_TYPES = ["MC", "SARSA", "ESARSA", "QL"]
+ACTION_SELECTORS = ["EPS", "UCB"]
+AVERAGE_UPDATES = [True, False]
+
+
+def configurations():
+    """ Returns every (aitype, action_selector, use_average_update) combination """
+    return list(itertools.product(AI_TYPES, ACTION_SELECTORS, AVERAGE_UPDATES))
+
+
+def config_name(aitype, action_selector, use_average_update):
+    """ Returns the name a configuration is recorded under """
+    return aitype + "-" + action_selector + ("-AVG" if use_average_update else "-STEP")
+
+
+def train(model_class, aitype, action_selector, use_average_update, episodes, seed, check_for_convergence=False):
+    """
+    Train one Controller
+    :return: the trained Controller
+    """
+    rng = RandomStream.RandomStream(seed)
+    return Controller.Controller(model=model_class(rng),
+                                 aitype=aitype,
+                                 action_selector=action_selector,
+                                 num_iterations=episodes,
+                                 use_average_update=use_average_update,
+                                 check_for_convergence=check_for_convergence,
+                                 rng=rng)
+
+
+def benchmark_config(model_class, aitype, action_selector, use_average_update, episodes, games, seed,
+                     memory_episodes, convergence_episodes):
+    """
+    Benchmark one configuration
+    :param model_class: function of a RandomStream returning the model, see ModelFactory.model_factory
+    :param episodes: number of training games timed
+    :param games: number of evaluation games timed
+    :param seed: seed of the training and evaluation streams
+    :param memory_episodes: number of training games run while tracing memory
+    :param convergence_episodes: maximum number of games of the time-to-convergence run, 0 to skip it
+    :return: dictionary of measurements
+    """
+    result = {"config": config_name(aitype, action_selector, use_average_update),
+              "aitype": aitype,
+              "action_selector": action_selector,
+              "use_average_update": use_average_update}
+
+    start = time.perf_counter()
+    c = train(model_class, aitype, action_selector, use_average_update, episodes, seed)
+    elapsed = time.perf_counter() - start
+    result["train_seconds"] = elapsed
+    result["episodes_per_second"] = episodes / elapsed
+
+    start = time.perf_counter()
+    Evaluator.evaluate_policy(c.P, games, seed=seed)
+    elapsed = time.perf_counter() - start
+    result["eval_seconds"] = elapsed
+    result["games_per_second"] = games / elapsed
+
+    # tracing slows everything down, so memory is measured on separate, shorter runs
+    tracemalloc.start()
+    c = train(model_class, aitype, action_selector, use_average_update, memory_episodes, seed)
+    Evaluator.evaluate_policy(c.P, games, seed=seed)
+    result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result["converged_at"] = None
+    result["convergence_seconds"] = None
+    if convergence_episodes > 0:
+        start = time.perf_counter()
+        c = train(model_class, aitype, action_selector, use_average_update, convergence_episodes, seed,
+                  check_for_convergence=True)
+        if c.convergedAt is not None:
+            result["converged_at"] = c.convergedAt
+            result["convergence_seconds"] = time.perf_counter() - start
+
+    return result
+
+
+def load_history(path):
+    """ Returns the list of previous benchmark runs stored at path """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    """ Write the benchmark history, replacing the file only once it is complete """
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(temporary, path)
+
+
+def find_regressions(run, previous, tolerance):
+    """
+    Compare a run with the previous run of the same settings
+    :param tolerance: allowed relative slowdown, e.g. 0.1 for 10%
+    :return: list of (config, metric, previous value, new value) for every throughput that dropped too far
+    """
+    if previous is None:
+        return []
+    before = {result["config"]: result for result in previous["results"]}
+    regressions = []
+    for result in run["results"]:
+        old = before.get(result["config"])
+        if old is None:
+            continue
+        for metric in ["episodes_per_second", "games_per_second"]:
+            if result[metric] < old[metric] * (1 - tolerance):
+                regressions.append((result["config"], metric, old[metric], result[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark training and evaluation throughput")
+    parser.add_argument("--episodes", type=int, default=20000, help="training games timed per configuration")
+    parser.add_argument("--games", type=int, default=200000, help="evaluation games timed per configuration")
+    parser.add_argument("--memory-episodes", type=int, default=2000,
+                        help="training games run while measuring peak memory")
+    parser.add_argument("--convergence-episodes", type=int, default=0,
+                        help="maximum games of the time-to-convergence run, 0 skips it")
+    parser.add_argument("--model", choices=sorted(ModelFactory.MODELS), default="Model", help="game model to train on")
+    parser.add_argument("--dealer-table", choices=ModelFactory.DEALER_TABLES, default="none",
+                        help="resolve the dealer's turn from a DealerTable, by sampling or by expected reward")
+    parser.add_argument("--decks", type=int, default=0, help="decks of the shoe dealt from, 0 for an infinite deck")
+    parser.add_argument("--seed", type=int, default=0, help="seed of every run")
+    parser.add_argument("--history", default="benchmarks.json", help="JSON file the results are appended to")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative throughput drop")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args(argv)
+
+    settings = {"episodes": args.episodes,
+                "games": args.games,
+                "memory_episodes": args.memory_episodes,
+                "convergence_episodes": args.convergence_episodes,
+                "model": args.model,
+                "dealer_table": args.dealer_table,
+                "decks": args.decks,
+                "seed": args.seed}
+    run = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+           "python": platform.python_version(),
+           "numpy": np.__version__,
+           "machine": platform.machine(),
+           "settings": settings,
+           "results": []}
+
+    for aitype, action_selector, use_average_update in configurations():
+        result = benchmark_config(ModelFactory.model_factory(args.model, args.dealer_table, args.decks),
+                                  aitype, action_selector, use_average_update,
+                                  args.episodes, args.games, args.seed, args.memory_episodes,
+                                  args.convergence_episodes)
+        run["results"].append(result)
+        print("%-16s %10.0f episodes/s %12.0f games/s %8.1f MiB peak   converged at %s"
+              % (result["config"], result["episodes_per_second"], result["games_per_second"],
+                 result["peak_memory_bytes"] / 2 ** 20, result["converged_at"]))
+
+    history = load_history(args.history)
+    previous = next((old for old in reversed(history) if old["settings"] == settings), None)
+    regressions = find_regressions(run, previous, args.tolerance)
+    for config, metric, old, new in regressions:
+        print("REGRESSION %s %s: %.0f -> %.0f" % (config, metric, old, new))
+
+    history.append(run)
+    save_history(args.history, history)
+
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
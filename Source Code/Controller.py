@@ -4,26 +4,61 @@
 # Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
 # Controller class which represents the AI agent
 
-import random
-import math
-import copy
+import numpy as np
+import PolicyStore
+import Profiler
+import ReplayBuffer
+import StateIndex
+import Tables
+import UCBSelector
+import UpdateEngine
+
+# Q values moving more than this since the last snapshot mean the policy has not converged
+CONVERGENCE_TOLERANCE = 0.15
+
+# state-actions visited more than twice but fewer than this many times mean the policy has not converged
+MIN_CONVERGENCE_VISITS = 30
 
 class Controller:
     """
     Constructor takes:
-    model = Model object we will use
-    aitype = type of AI used: "MC" (Monte-Carlo), "SARSA", or "QL" (Q Learning)
+    model = Model object we will use, or a FastModel for headless training
+    aitype = type of AI used: "MC" (Monte-Carlo), "SARSA", "ESARSA" (Expected SARSA), or "QL" (Q Learning)
     action_selector = Either "EPS" (Epsilon-Greedy) or "UCB" (Upper Confidence Bound)
     ai_parameter_1 = Value between 0 and 1. Represents step-size for MC, or alpha value for the other two
-    ai_parameter_2 = Value between 0 and 1. Represents Gamma(discount factor) for QL and SARSA, not used by MC
+    ai_parameter_2 = Value between 0 and 1. Represents Gamma(discount factor) for QL and the SARSAs, not used by MC
     selector_parameter = Value between 0 and 1. Represents epsilon for epsilon-greedy, or c (exploration constant) for UCB
     num_iterations = the number of games to play
     use_average_update: True or False based on whether to use average update method
+    num_workers = number of processes to split the games across, 1 trains in this process. The workers play the
+    same model class, dealer table and shoe as model, but can't check for convergence or profile
+    sync_interval = number of games each worker plays between merging its maps with the other workers, the workers
+    merge together so a seeded run trains the same maps for the same num_workers and sync_interval
+    convergence_window = minimum number of games between the Q snapshot and a convergence decision
+    rng = RandomStream used for exploration, defaults to the model's stream
+    profile = True to count the time spent in every training phase, see stats()
+    stats_file = optional file that profiling snapshots are streamed to, in place of the verbose prints
+    stats_interval = number of games between profiling snapshots
+    n_step = number of rewards the SARSA, ESARSA and QL updates add up before bootstrapping
+    update_batch = number of games whose updates are applied together
+    ESARSA, an n_step above 1 or an update_batch above 1 update Q through an UpdateEngine, see apply_updates
+    replay_capacity = number of transitions QL keeps in a replay buffer, 0 to update from each transition once.
+    Replaying can't be combined with an n_step or update_batch above 1
+    replay_batch = number of stored transitions QL updates from after every step, when replaying
 
     Other attributes:
-    Q, P and N represent maps for values, policy, and number of times a state is visited
+    Q, P and N represent maps for values, policy, and number of times a state is visited, stored as numpy arrays
+    shaped (mapSize, dealerSize, len(actions)) and indexed by the dense rows and columns of StateIndex
+    (see get_state), StateIndex.legacy_table converts them to the get_state_rl() layout
     mapSize, dealerSize, actions control the size of our maps
     t represents the time-steps
+    QConverge is the snapshot of Q that convergence is measured against, driftCount the number of entries of Q
+    that moved away from it and underVisitedCount the number of state-actions with too few visits
+    convergedAt is the iteration the policy converged at, None if it has not
+    updateEngine is the UpdateEngine buffering the updates, None when every step is updated as it is played
+    replayBuffer is the ReplayBuffer of QL, None when not replaying
+    ucbSelector is the UCBSelector keeping the exploration bonuses of UCB, None for epsilon-greedy
+    episodesPlayed counts the games learned from so far, over every call to learn
     """
     def __init__(self,
                  model,
@@ -35,77 +70,202 @@ class Controller:
                  num_iterations=2500000,
                  use_average_update=True,
                  check_for_convergence=False,
-                 verbose=False):
+                 verbose=False,
+                 num_workers=1,
+                 sync_interval=20000,
+                 convergence_window=20000,
+                 rng=None,
+                 profile=False,
+                 stats_file=None,
+                 stats_interval=20000,
+                 n_step=1,
+                 update_batch=1,
+                 replay_capacity=0,
+                 replay_batch=32):
+
+        # the workers neither check for convergence nor profile, see ParallelTrainer
+        if num_workers > 1 and (check_for_convergence or profile or stats_file is not None):
+            raise ValueError("Convergence checks and profiling are not supported with more than one worker")
 
         # Get initial values from Model
         self.last_policymap = []
         self.model = model
+        self.rng = rng if rng is not None else model.rng
         self.AIType = aitype
         self.ActionSelector = action_selector
         self.AIParameter = ai_parameter_1
         self.AIParameter2 = ai_parameter_2
         self.SelectorParameter = selector_parameter
         self.IterationNum = num_iterations
-        self.mapSize = 130
-        self.dealerSize = 12
+        self.mapSize = StateIndex.NUMBER_OF_ROWS
+        self.dealerSize = StateIndex.NUMBER_OF_COLUMNS
         self.stepSize = 0.1
         self.actions = [0, 1, 2]
         self.t = 1
         self.verbose = verbose
         self.useAverageUpdate = use_average_update
         self.checkForConvergence = check_for_convergence
-
-        self.Q = [[[0 for action in range(len(self.actions))] for dealer in range(self.dealerSize)] for player in
-                  range(self.mapSize)]
-
-        self.P = [[[1.0 / len(self.actions) for action in range(len(self.actions))] for dealer in range(self.dealerSize)]
-                  for hand in range(self.mapSize)]
-
-        self.N = [[[1 for action in range(len(self.actions))] for dealer in range(self.dealerSize)] for player in
-                  range(self.mapSize)]
-
-        self.QConverge = [[[1 for action in range(len(self.actions))] for dealer in range(self.dealerSize)]
-                  for hand in range(self.mapSize)]
+        self.numWorkers = num_workers
+        self.syncInterval = sync_interval
+        self.convergenceWindow = convergence_window
+        self.convergedAt = None
+        self.episodesPlayed = 0
+        self.nStep = n_step
+        self.updateBatch = update_batch
+        self.replayCapacity = replay_capacity
+        self.replayBatch = replay_batch
+        self.replayBuffer = None
+        self.updateEngine = None
+        if aitype == "QL" and replay_capacity > 0:
+            # replayed transitions are updated one at a time as they are sampled, there is nothing to batch
+            if n_step > 1 or update_batch > 1:
+                raise ValueError("QL with a replay buffer can't be combined with n_step or update_batch above 1")
+            self.replayBuffer = ReplayBuffer.ReplayBuffer(replay_capacity, self.dealerSize, self.rng)
+        elif aitype == "ESARSA" or n_step > 1 or update_batch > 1:
+            self.updateEngine = UpdateEngine.UpdateEngine(self, n_step, update_batch)
+
+        self.Q = Tables.value_table(self.mapSize, self.dealerSize, len(self.actions))
+        self.P = Tables.policy_table(self.mapSize, self.dealerSize, len(self.actions))
+        self.N = Tables.count_table(self.mapSize, self.dealerSize, len(self.actions))
+        self.QConverge = Tables.value_table(self.mapSize, self.dealerSize, len(self.actions), fill=1.0)
+
+        self.ucbSelector = None
+        if action_selector == "UCB":
+            self.ucbSelector = UCBSelector.UCBSelector(self, selector_parameter)
+
+        # profiling wraps the training phases, so leave it out entirely unless asked for
+        self.profiler = None
+        if profile or stats_file is not None:
+            self.profiler = Profiler.Profiler(stats_file, stats_interval)
+            self.profiler.install(self)
+
+        # the first convergence check always takes a new snapshot
+        self.snapshotAge = self.convergenceWindow
+        self.reset_convergence()
 
         self.learn()
 
-    def learn(self):
+    def learn(self, num_iterations=None, checkpoints=None, callback=None):
         """
-        This function learns the policy, initializing the maps, then plays the given number of games
+        This function learns the policy by playing the given number of games. Calling it again continues
+        the training from where it stopped
+        :param num_iterations: number of games to play, defaults to the num_iterations given to the constructor
+        :param checkpoints: optional list of iteration counts (counted over every call, like episodesPlayed)
+        :param callback: called as callback(iteration, P, Q) with copies of the maps when this call's training reaches
+        each checkpoint. If training converges first, the remaining checkpoints of this call get the final maps.
+        Required when checkpoints are given
         :return: None
         """
-        for i in range(self.IterationNum):
+        if checkpoints and callback is None:
+            raise ValueError("Checkpoints need a callback to hand the maps to")
+        if num_iterations is None:
+            num_iterations = self.IterationNum
+        stop = self.episodesPlayed + num_iterations
+
+        # checkpoints this call will reach, the next one last
+        pending = sorted((checkpoint for checkpoint in checkpoints or [] if checkpoint > self.episodesPlayed),
+                         reverse=True)
+
+        # split the games across worker processes, imported here as the workers build Controllers themselves
+        if self.numWorkers > 1:
+            import ParallelTrainer
+            while self.episodesPlayed < stop:
+                segment_end = min(pending[-1], stop) if pending else stop
+                ParallelTrainer.learn_parallel(self, segment_end - self.episodesPlayed)
+                self.episodesPlayed = segment_end
+                self.send_checkpoints(pending, callback, self.episodesPlayed)
+            return
+
+        for i in range(self.episodesPlayed, stop):
 
             # refresh the model to a new game
             self.model.start()
 
             # exploring starts? (maybe)
-            self.model.playerHand.hand_sum = random.randint(2, 21)
-            if self.model.playerHand.hand_sum > 11:
-                if random.random() < (4 / 52):
-                    self.model.playerHand.number_of_aces = 1
-            if self.model.playerHand.hand_sum == 2:
-                self.model.playerHand.number_of_aces = 2
-            if self.model.playerHand.hand_sum == 3:
-                self.model.playerHand.number_of_aces = 1
-
-            # print iteration number for every 20,000 iterations
-            if i % 20000 == 0:
-                if self.verbose:
-                    print("i =", i)
-
-                if self.checkForConvergence and self.converged_policy():
+            hand_sum = self.rng.randint(2, 21)
+            number_of_aces = None
+            if hand_sum > 11:
+                if self.rng.uniform() < (4 / 52):
+                    number_of_aces = 1
+            if hand_sum == 2:
+                number_of_aces = 2
+            if hand_sum == 3:
+                number_of_aces = 1
+            self.model.set_player_hand(hand_sum, number_of_aces)
+
+            # print iteration number for every 20,000 iterations, or stream a profiling snapshot instead
+            if self.profiler is not None and self.profiler.statsFile is not None:
+                if i % self.profiler.interval == 0:
+                    self.profiler.write_snapshot(i)
+            elif i % 20000 == 0 and self.verbose:
+                print("i =", i)
+
+            if self.checkForConvergence:
+                if self.converged_policy():
                     print("converged at iteration: ", i)
+                    self.convergedAt = i
                     break
+                self.snapshotAge += 1
 
             episode = self.generate_game()
 
-            if self.AIType == "MC":
-                self.update_values_mc(episode)
-
-            self.update_policy(episode)
+            if self.updateEngine is not None:
+                self.updateEngine.add_episode(episode)
+                if self.updateEngine.is_full():
+                    self.apply_updates()
+            else:
+                if self.AIType == "MC":
+                    self.update_values_mc(episode)
+                self.update_policy(episode)
+            self.episodesPlayed = i + 1
+
+            if pending and pending[-1] == self.episodesPlayed:
+                self.apply_updates()
+                self.send_checkpoints(pending, callback, self.episodesPlayed)
+
+        self.apply_updates()
+        self.send_checkpoints(pending, callback, stop)
+
+        if self.profiler is not None:
+            self.profiler.write_snapshot(self.episodesPlayed)
         return
 
+    def apply_updates(self):
+        """
+        This function applies the updates the UpdateEngine has buffered, if any
+        :return: None
+        """
+        if self.updateEngine is not None:
+            self.updateEngine.flush()
+
+    def send_checkpoints(self, pending, callback, iteration):
+        """
+        This function hands copies of P and Q to the callback for every pending checkpoint up to iteration
+        :param pending: checkpoints still to come, the next one last, sent ones are removed
+        :param callback: called as callback(checkpoint, P, Q)
+        :param iteration: checkpoints up to this iteration are sent
+        :return: None
+        """
+        while pending and pending[-1] <= iteration:
+            callback(pending.pop(), self.P.copy(), self.Q.copy())
+
+    def save(self, path):
+        """
+        This function saves Q, P and N with the Controller's parameters in the binary format of PolicyStore.
+        Saving to the same file again overwrites the maps in place, e.g. at every checkpoint of learn with
+        callback=lambda iteration, P, Q: controller.save(path)
+        :param path: file to write
+        :return: None
+        """
+        PolicyStore.save(path, self)
+
+    def stats(self):
+        """
+        This function returns the profiling counters
+        :return: dictionary of counters, empty when the Controller was not created with profile=True
+        """
+        return self.profiler.stats() if self.profiler is not None else {}
+
     def generate_game(self):
         """
         This function creates and plays one game of Black-Jack
@@ -117,33 +277,36 @@ class Controller:
         while self.model.isRunning:
 
             # state is of the form [playerHand, dealerHand]
-            state = self.model.get_state_rl()
+            state = self.get_state()
 
             # for QLearning, we pick a random action to take, for the other two, we pick based on the policy
             action = self.select_action_random() if self.AIType == "QL" else self.select_action(state)
 
-            # Update time-steps                                                                                       )
-            self.N[state[0]][state[1]][action] += 1
+            # Update time-steps
+            self.visit(state[0], state[1], action)
             self.t += 1
 
             # do the action
             self.model.do_player_action(action)
 
             # play out dealer turn(s). If our action was stand, continue dealer action until game is done
-            while not self.model.playerTurn and self.model.isRunning:
-                self.model.do_dealer_action()
+            self.play_dealer_turn()
 
             # get reward from the model for our action
             reward = self.model.get_reward()
 
-            # if SARSA or Q-Learning, update Q based on the respective formula
-            if self.AIType == "SARSA":
-                state_next = self.model.get_state_rl()
+            # if SARSA or Q-Learning, update Q based on the respective formula, unless the UpdateEngine does it
+            if self.updateEngine is None and self.AIType == "SARSA":
+                state_next = self.get_state()
                 action_next = self.select_action(state_next)
                 self.update_values_sarsa(state, action, reward, state_next, action_next)
 
-            elif self.AIType == "QL":
-                state_next = self.model.get_state_rl()
+            elif self.replayBuffer is not None:
+                self.replayBuffer.add(state, action, reward, self.get_state(), not self.model.isRunning)
+                self.update_values_ql_batch(*self.replayBuffer.sample(self.replayBatch))
+
+            elif self.updateEngine is None and self.AIType == "QL":
+                state_next = self.get_state()
                 action_next = self.select_action_best(state_next)
                 self.update_values_ql(state, action, reward, state_next, action_next)
 
@@ -152,20 +315,104 @@ class Controller:
 
         return episode
 
+    def get_state(self):
+        """
+        This function gets the model's state as the row and column of our maps
+        :return: (row, column), a bust or finished hand maps to the terminal row
+        """
+        player_hand, dealer_hand = self.model.get_state_rl()
+        return StateIndex.ROW[player_hand], StateIndex.COLUMN[dealer_hand]
+
+    def play_dealer_turn(self):
+        """
+        This function plays the dealer's actions until it is the player's turn again or the game is done
+        :return: None
+        """
+        while not self.model.playerTurn and self.model.isRunning:
+            self.model.do_dealer_action()
+
     def converged_policy(self):
         """
-        This function checks if the policy has converged by checking for difference between Q values at certain steps
-        as long as the action has been called atleast 30 times
-        :return:
+        This function checks if the policy has converged: no Q value has moved from the snapshot taken at least
+        convergenceWindow games ago, and every action tried has been called atleast 30 times. It only reads the
+        counters kept by set_q and visit, and takes a new snapshot when the window has passed with Q still moving
+        :return: True if the policy has converged
+        """
+        if self.snapshotAge < self.convergenceWindow:
+            return False
+
+        if self.driftCount > 0:
+            np.copyto(self.QConverge, self.Q)
+            self.driftCount = 0
+            self.snapshotAge = 0
+            return False
+
+        return self.underVisitedCount == 0
+
+    def reset_convergence(self):
         """
-        for player in range(self.mapSize):
-            for dealer in range(self.dealerSize):
-                for action in range(len(self.actions)):
-                    if abs(self.Q[player][dealer][action]-self.QConverge[player][dealer][action])>0.15 \
-                            or (self.N[player][dealer][action]<30 and self.N[player][dealer][action]>2):
-                        self.QConverge = copy.deepcopy(self.Q)
-                        return False
-        return True
+        This function recounts the convergence counters from the maps, needed when Q or N are changed
+        without going through set_q and visit
+        :return: None
+        """
+        self.driftCount = int(np.count_nonzero(np.abs(self.Q - self.QConverge) > CONVERGENCE_TOLERANCE))
+        self.underVisitedCount = int(np.count_nonzero((self.N < MIN_CONVERGENCE_VISITS) & (self.N > 2)))
+
+    def set_q(self, player_hand, dealer_hand, action, value):
+        """
+        This function writes one entry of Q, keeping the convergence counters up to date
+        :param player_hand:
+        :param dealer_hand:
+        :param action:
+        :param value: new value of Q[player_hand][dealer_hand][action]
+        :return: None
+        """
+        if self.checkForConvergence:
+            snapshot = self.QConverge[player_hand, dealer_hand, action]
+            self.driftCount += int(abs(value - snapshot) > CONVERGENCE_TOLERANCE) - \
+                int(abs(self.Q[player_hand, dealer_hand, action] - snapshot) > CONVERGENCE_TOLERANCE)
+        self.Q[player_hand, dealer_hand, action] = value
+
+    def add_q(self, player_hands, dealer_hands, actions, deltas):
+        """
+        This function adds deltas to many entries of Q at once, repeated entries add up, keeping the convergence
+        counters up to date
+        :param player_hands: array of player elements
+        :param dealer_hands: array of dealer elements
+        :param actions: array of actions
+        :param deltas: array of amounts to add
+        :return: None
+        """
+        if not self.checkForConvergence:
+            np.add.at(self.Q, (player_hands, dealer_hands, actions), deltas)
+            return
+
+        entries = np.unique(np.ravel_multi_index((player_hands, dealer_hands, actions), self.Q.shape))
+        values = self.Q.reshape(-1)
+        snapshot = self.QConverge.reshape(-1)[entries]
+        before = np.count_nonzero(np.abs(values[entries] - snapshot) > CONVERGENCE_TOLERANCE)
+        np.add.at(self.Q, (player_hands, dealer_hands, actions), deltas)
+        after = np.count_nonzero(np.abs(values[entries] - snapshot) > CONVERGENCE_TOLERANCE)
+        self.driftCount += int(after) - int(before)
+
+    def visit(self, player_hand, dealer_hand, action):
+        """
+        This function counts one visit of a state-action in N, keeping the convergence counters and the UCB
+        exploration bonuses up to date
+        :param player_hand:
+        :param dealer_hand:
+        :param action:
+        :return: None
+        """
+        self.N[player_hand, dealer_hand, action] += 1
+        if self.ucbSelector is not None:
+            self.ucbSelector.visit(player_hand, dealer_hand, action)
+        if self.checkForConvergence:
+            visits = self.N[player_hand, dealer_hand, action]
+            if visits == 3:
+                self.underVisitedCount += 1
+            elif visits == MIN_CONVERGENCE_VISITS:
+                self.underVisitedCount -= 1
 
     def select_action(self, state):
         """
@@ -187,29 +434,12 @@ class Controller:
         """
         This function selects an action based on the Upper Confidence Bound method
         forumula: best action = max value of [Q[state][action] + c * sqrt(ln t/Nt(a)) ]
+        the bonuses are kept by the UCBSelector, untried actions are chosen first
 
         :param state:
         :return: action
         """
-        player_hand = state[0]
-        dealer_hand = state[1]
-        ucbvalues = [0,0,0]
-        max_action_value = -99999
-        max_actions = []
-
-        for action in range(len(self.actions)):
-            ucbvalues[action] = self.Q[player_hand][dealer_hand][action] + self.SelectorParameter * \
-                                math.sqrt(math.log(self.t)/self.N[player_hand][dealer_hand][action])
-
-        for action in range(len(ucbvalues)):
-            if max_action_value < self.P[player_hand][dealer_hand][action]:
-                max_action_value = self.P[player_hand][dealer_hand][action]
-
-        for action in range(len(ucbvalues)):
-            if abs(max_action_value - self.P[player_hand][dealer_hand][action]) < 0.0001:
-                max_actions.append(action)
-
-        return random.choice(max_actions)
+        return self.ucbSelector.select(state)
 
     def select_action_epsilon(self, state):
         """
@@ -218,7 +448,7 @@ class Controller:
         :param state:
         :return: action
         """
-        random_p = random.random()
+        random_p = self.rng.uniform()
 
         if random_p < self.SelectorParameter:
             return self.select_action_random()
@@ -231,7 +461,7 @@ class Controller:
         This function returns a random action from the self.actions
         :return: action
         """
-        return random.choice(self.actions)
+        return self.rng.choice(self.actions)
 
     def select_action_best(self, state):
         """
@@ -239,20 +469,9 @@ class Controller:
         :param state:
         :return: action
         """
-        player_hand = state[0]
-        dealer_hand = state[1]
-        max_action_value = -99999
-        max_actions = []
-
-        for action in range(len(self.actions)):
-            if max_action_value < self.P[player_hand][dealer_hand][action]:
-                max_action_value = self.P[player_hand][dealer_hand][action]
-
-        for action in range(len(self.actions)):
-            if abs(max_action_value - self.P[player_hand][dealer_hand][action]) < 0.0001:
-                max_actions.append(action)
+        max_actions = np.flatnonzero(Tables.best_actions(self.P[state[0], state[1]]))
 
-        return random.choice(max_actions)
+        return int(self.rng.choice(max_actions))
 
     def update_values_sarsa(self, state, action, reward, state_next, action_next):
         """
@@ -270,14 +489,15 @@ class Controller:
         player_hand_next = state_next[0]
         dealer_hand_next = state_next[1]
 
-        # if we need to use average update rule
+        # if we need to use average update rule, AIParameter keeps the configured step size
+        step_size = self.AIParameter
         if self.useAverageUpdate:
-            self.AIParameter = self.updateTimeStep(player_hand,dealer_hand,action)
+            step_size = self.updateTimeStep(player_hand,dealer_hand,action)
 
-        self.Q[player_hand][dealer_hand][action] += \
-            self.AIParameter * \
-            (reward + self.AIParameter2 *
-             self.Q[player_hand_next][dealer_hand_next][action_next] - self.Q[player_hand][dealer_hand][action])
+        value = self.Q[player_hand, dealer_hand, action]
+        self.set_q(player_hand, dealer_hand, action, value +
+                   step_size *
+                   (reward + self.AIParameter2 * self.Q[player_hand_next, dealer_hand_next, action_next] - value))
 
         return
 
@@ -295,12 +515,13 @@ class Controller:
             dealer_hand = episode[t][0][1]
             action = episode[t][1]
 
-            # if we need to use average update rule
+            # if we need to use average update rule, AIParameter keeps the configured step size
+            step_size = self.AIParameter
             if self.useAverageUpdate:
-                self.AIParameter = self.updateTimeStep(player_hand,dealer_hand,action)
+                step_size = self.updateTimeStep(player_hand,dealer_hand,action)
 
-            self.Q[player_hand][dealer_hand][action] += self.AIParameter * (
-                        final_reward - self.Q[player_hand][dealer_hand][action])
+            value = self.Q[player_hand, dealer_hand, action]
+            self.set_q(player_hand, dealer_hand, action, value + step_size * (final_reward - value))
 
         return
 
@@ -320,13 +541,52 @@ class Controller:
         player_hand_next = state_next[0]
         dealer_hand_next = state_next[1]
 
+        # if we need to use average update rule, AIParameter keeps the configured step size
+        step_size = self.AIParameter
+        if self.useAverageUpdate:
+            step_size = self.updateTimeStep(player_hand,dealer_hand,action)
+
+        value = self.Q[player_hand, dealer_hand, action]
+        self.set_q(player_hand, dealer_hand, action, value + step_size * (
+                reward + self.AIParameter2 * self.Q[player_hand_next, dealer_hand_next, action_next] - value))
+
+        return
+
+    def update_values_ql_batch(self, player_hands, dealer_hands, actions, rewards, player_hands_next,
+                               dealer_hands_next, done):
+        """
+        This function updates the values array for Q-Learning from a minibatch of transitions, with the
+        formula: Q[S][A] = Q[S][A] + α*(R + γ*max_action_Q[S’][a] – Q[S][A]), where a finished game adds nothing
+        after R. Every transition is measured from Q before the minibatch, and a state-action drawn several times
+        takes one step towards the average of its targets, so no entry moves past its targets however often the
+        minibatch repeats it
+        :param player_hands: arrays of the transitions, as returned by ReplayBuffer.sample
+        :param dealer_hands:
+        :param actions:
+        :param rewards:
+        :param player_hands_next:
+        :param dealer_hands_next:
+        :param done:
+        :return: None
+        """
+        targets = rewards + self.AIParameter2 * np.where(done, 0.0,
+                                                         self.Q[player_hands_next, dealer_hands_next].max(axis=1))
+        errors = targets - self.Q[player_hands, dealer_hands, actions]
+
+        # merge the repeated state-actions of the minibatch, averaging their errors
+        entries, inverse = np.unique(np.ravel_multi_index((player_hands, dealer_hands, actions), self.Q.shape),
+                                     return_inverse=True)
+        errors = np.bincount(inverse, weights=errors) / np.bincount(inverse)
+        player_hands, dealer_hands, actions = np.unravel_index(entries, self.Q.shape)
+
         # if we need to use average update rule
         if self.useAverageUpdate:
-            self.AIParameter = self.updateTimeStep(player_hand,dealer_hand,action)
+            errors /= self.N[player_hands, dealer_hands, actions]
+        else:
+            errors *= self.AIParameter
+        self.add_q(player_hands, dealer_hands, actions, errors)
 
-        self.Q[player_hand][dealer_hand][action] += self.AIParameter * (
-                reward + self.AIParameter2 * self.Q[player_hand_next][dealer_hand_next][action_next] -
-                self.Q[player_hand][dealer_hand][action])
+        self.P[player_hands, dealer_hands] = Tables.greedy_policy(self.Q[player_hands, dealer_hands])
 
         return
 
@@ -337,25 +597,10 @@ class Controller:
         :param episode:
         :return: None
         """
-        for t in range(len(episode)):
-
-            max_actions = []
-            max_action_value = -99999
-            player_hand = episode[t][0][0]
-            dealer_hand = episode[t][0][1]
-
-            for action in range(len(self.actions)):
-                if max_action_value < self.Q[player_hand][dealer_hand][action]:
-                    max_action_value = self.Q[player_hand][dealer_hand][action]
-
-            for action in range(len(self.actions)):
-                if abs(max_action_value - self.Q[player_hand][dealer_hand][action]) < 0.0001:
-                    max_actions.append(action)
-
-            self.P[player_hand][dealer_hand] = [0, 0, 0]
+        player_hands = [step[0][0] for step in episode]
+        dealer_hands = [step[0][1] for step in episode]
 
-            for action in max_actions:
-                self.P[player_hand][dealer_hand][action] = 1.0/len(max_actions)
+        self.P[player_hands, dealer_hands] = Tables.greedy_policy(self.Q[player_hands, dealer_hands])
 
         return
 
@@ -365,4 +610,4 @@ class Controller:
         :param state:
         :return:
         """
-        return 1/(self.N[player_hand][dealer_hand][action])
+        return 1/(self.N[player_hand, dealer_hand, action])
@@ -0,0 +1,102 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# DealerTable resolves the dealer's whole turn from a precomputed outcome table instead of drawing card by card
+
+import numpy as np
+import Solver
+
+# final dealer totals of every outcome column, a bust is recorded as 22
+OUTCOME_TOTALS = Solver.DEALER_TOTALS + [22]
+
+
+def alias_table(probabilities):
+    """
+    Build the tables of Vose's alias method, which draws from a discrete distribution with one uniform number
+    :param probabilities: probability of every outcome
+    :return: list of acceptance probabilities and list of alias outcomes, one per outcome
+    """
+    count = len(probabilities)
+    scaled = [float(p) * count for p in np.asarray(probabilities) / np.sum(probabilities)]
+    accept = [1.0] * count
+    alias = list(range(count))
+
+    small = [i for i in range(count) if scaled[i] < 1.0]
+    large = [i for i in range(count) if scaled[i] >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        accept[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = scaled[more] + scaled[less] - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    # whatever is left over only differs from 1 by rounding
+    for i in small + large:
+        accept[i] = 1.0
+    return accept, alias
+
+
+class DealerTable:
+    """
+    This class holds the distribution of the dealer's final total for every upcard, which is all the dealer's turn
+    depends on. A Model given a DealerTable finishes the dealer's turn in a single do_dealer_action
+
+    Constructor takes:
+    rng = RandomStream the outcomes are drawn from
+    expected = True to skip drawing an outcome and score the game with its exact expected reward instead,
+               which removes the dealer's noise from the rewards an update learns from
+
+    Other attributes:
+    outcomes is the distribution array indexed [upcard][outcome], with OUTCOME_TOTALS as outcomes
+    samples counts the dealer turns resolved from the table
+    """
+
+    def __init__(self, rng, expected=False):
+        """ Constructor """
+        self.rng = rng
+        self.expected = expected
+        self.outcomes = Solver.dealer_outcomes()
+        self.samples = 0
+
+        # alias tables of every upcard, as lists since they are read one entry at a time
+        self.accept = [[1.0] * len(OUTCOME_TOTALS) for _ in range(len(self.outcomes))]
+        self.alias = [list(range(len(OUTCOME_TOTALS))) for _ in range(len(self.outcomes))]
+        for upcard in Solver.UPCARDS:
+            self.accept[upcard], self.alias[upcard] = alias_table(self.outcomes[upcard])
+
+        # exact reward of every final player sum, doubled or not, against every upcard
+        self.rewards = {}
+        for multiplier in [1, 2]:
+            table = np.zeros((22, len(self.outcomes)))
+            for player_sum in range(2, 22):
+                for upcard in Solver.UPCARDS:
+                    table[player_sum, upcard] = Solver.stand_reward(player_sum, self.outcomes[upcard], multiplier)
+            self.rewards[multiplier] = table.tolist()
+
+    def sample(self, upcard):
+        """
+        Draw the dealer's final total
+        :param upcard: value of the dealer's first card
+        :return: final total, 22 for a bust
+        """
+        self.samples += 1
+        position = self.rng.uniform() * len(OUTCOME_TOTALS)
+        column = int(position)
+        if position - column >= self.accept[upcard][column]:
+            column = self.alias[upcard][column]
+        return OUTCOME_TOTALS[column]
+
+    def expected_reward(self, player_sum, upcard, multiplier=1):
+        """
+        Exact expected reward of a finished player hand, with the same rules as Model.get_reward
+        :param player_sum: final sum of the player's hand, not bust
+        :param upcard: value of the dealer's first card
+        :param multiplier: 2 if the player has doubled down, otherwise 1
+        :return: expected reward
+        """
+        self.samples += 1
+        return self.rewards[multiplier][player_sum][upcard]
@@ -0,0 +1,286 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Evaluator plays a fixed policy over many games to measure how well it does
+
+import math
+import multiprocessing
+import queue
+import statistics
+import traceback
+import numpy as np
+import BatchModel
+import Model
+import RandomStream
+import Shoe
+import StateIndex
+import Tables
+
+# metrics an evaluation can stop early on, with the key of their confidence interval in the result
+STOPPING_METRICS = {"loss_rate": "loss_rate_ci", "mean_reward": "reward_ci"}
+
+# seconds BackgroundEvaluator.results waits for a result before checking that the evaluation process still runs
+RESULT_POLL_SECONDS = 1.0
+
+
+def greedy_action_table(policy):
+    """
+    Precompute the action played in every state of a policy map
+    :param policy: policy map P (nested lists or array), of the dense or the get_state_rl() layout
+    :return: integer array of actions indexed [player][dealer] by get_state_rl() state
+    """
+    return Tables.greedy_actions(StateIndex.legacy_table(Tables.as_table(policy)))
+
+
+def play_batch(action_table, model):
+    """
+    Play every game of a BatchModel to the end following an action table
+    :param action_table: array of actions indexed [player][dealer]
+    :param model: BatchModel, restarted before playing
+    :return: array of rewards, one per game
+    """
+    model.start()
+    while np.any(model.playerTurn):
+        player, dealer = model.get_state_rl()
+        playing = model.playerTurn & model.isRunning
+        actions = np.zeros(model.numGames, dtype=np.int64)
+        actions[playing] = action_table[player[playing], dealer[playing]]
+        model.do_player_action(actions, playing)
+        model.play_dealer()
+    return model.get_reward()
+
+
+def play_shoe(action_table, model, n_games):
+    """
+    Play games one after another on a model dealing from a Shoe, following an action table. The games can't be
+    played in lockstep like play_batch does, as every game changes the cards left for the next
+    :param action_table: array of actions indexed [player][dealer]
+    :param model: FastModel dealing from a Shoe, the shoe carries on from the last game it dealt
+    :param n_games: number of games to play
+    :return: array of rewards, one per game
+    """
+    actions = action_table.tolist()
+    rewards = np.zeros(n_games)
+    for game in range(n_games):
+        model.start()
+        while model.playerTurn:
+            player, dealer = model.get_state_rl()
+            model.do_player_action(actions[player][dealer])
+        while model.isRunning:
+            model.do_dealer_action()
+        rewards[game] = model.get_reward()
+    return rewards
+
+
+def summarize(wins, draws, losses, reward_sum, reward_square_sum, confidence=0.95):
+    """
+    Build the evaluation result from running totals
+    :return: dictionary with the counts, rates, mean reward and confidence intervals
+    """
+    games = wins + draws + losses
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    mean_reward = reward_sum / games
+    reward_variance = max(reward_square_sum / games - mean_reward ** 2, 0.0) * games / max(games - 1, 1)
+    reward_margin = z * math.sqrt(reward_variance / games)
+
+    loss_rate = losses / games
+    loss_margin = z * math.sqrt(loss_rate * (1 - loss_rate) / games)
+
+    return {"games": games,
+            "wins": wins,
+            "draws": draws,
+            "losses": losses,
+            "win_rate": wins / games,
+            "draw_rate": draws / games,
+            "loss_rate": loss_rate,
+            "loss_rate_ci": (loss_rate - loss_margin, loss_rate + loss_margin),
+            "mean_reward": mean_reward,
+            "reward_ci": (mean_reward - reward_margin, mean_reward + reward_margin),
+            "confidence": confidence}
+
+
+def check_settings(n_games, batch_size=100000, confidence=0.95, target_width=None, threshold=None,
+                   metric="loss_rate", decks=0, penetration=0.75):
+    """
+    Raise ValueError if the arguments of evaluate_policy can't describe an evaluation, so that mistakes are
+    reported before any games are played or processes are started
+    :return: None
+    """
+    if n_games < 1:
+        raise ValueError("An evaluation needs at least one game")
+    if batch_size < 1:
+        raise ValueError("Evaluation batches need at least one game")
+    if not 0 < confidence < 1:
+        raise ValueError("Confidence must be above 0 and below 1")
+    if target_width is not None and target_width <= 0:
+        raise ValueError("The target width must be above 0")
+    if metric not in STOPPING_METRICS:
+        raise ValueError("Unknown stopping metric " + str(metric) + ", use one of " + ", ".join(STOPPING_METRICS))
+    if decks < 0:
+        raise ValueError("The number of decks can't be negative")
+    if decks > 0 and not 0 < penetration <= 1:
+        raise ValueError("Penetration must be above 0 and at most 1")
+
+
+def evaluate_policy(policy, n_games, seed=None, batch_size=100000, confidence=0.95, target_width=None,
+                    threshold=None, metric="loss_rate", decks=0, penetration=0.75):
+    """
+    Play up to n_games greedily following a policy, in vectorized batches, or one game after another when they are
+    dealt from a shoe. Given a target_width or a threshold, the running totals are checked after every batch and
+    the evaluation stops as soon as the answer is known
+    :param policy: policy map P, of the dense or the get_state_rl() layout
+    :param n_games: number of games to play, the most played when stopping early
+    :param seed: optional seed for the card draws
+    :param batch_size: number of games played at once, and how often the stopping targets are checked
+    :param confidence: confidence level of the returned intervals
+    :param target_width: stop once the confidence interval of metric is at most this wide
+    :param threshold: stop once metric is known to be above or below this value. The test is checked after every
+                      batch, so each check is made at a stricter confidence to keep the overall error within
+                      1 - confidence
+    :param metric: "loss_rate" or "mean_reward", what target_width and threshold apply to
+    :param decks: number of decks of a Shoe to deal from, like the model the policy was trained on, 0 to draw every
+                  card independently
+    :param penetration: fraction of the shoe dealt before reshuffling
+    :return: dictionary with win, draw and loss counts, mean reward and confidence intervals. It also holds which
+             target stopped the evaluation, "target_width", "threshold" or "games" if none was met within n_games,
+             and for a threshold the decision, "above", "below" or None
+    """
+    check_settings(n_games, batch_size, confidence, target_width, threshold, metric, decks, penetration)
+    interval = STOPPING_METRICS[metric]
+    # split the allowed error over every check the threshold test could make
+    test_confidence = 1 - (1 - confidence) / max(math.ceil(n_games / batch_size), 1)
+
+    action_table = greedy_action_table(policy)
+    rng = RandomStream.RandomStream(seed)
+
+    wins = draws = losses = 0
+    reward_sum = reward_square_sum = 0.0
+    model = None
+    shoe_model = Model.FastModel(rng, shoe=Shoe.Shoe(rng, decks, penetration)) if decks > 0 else None
+    stopped = "games"
+    decision = None
+
+    played = 0
+    while played < n_games:
+        size = min(batch_size, n_games - played)
+        if shoe_model is not None:
+            rewards = play_shoe(action_table, shoe_model, size)
+        else:
+            if model is None or model.numGames != size:
+                model = BatchModel.BatchModel(size, rng)
+            rewards = play_batch(action_table, model)
+        wins += int(np.count_nonzero(rewards > 0))
+        draws += int(np.count_nonzero(rewards == 0))
+        losses += int(np.count_nonzero(rewards < 0))
+        reward_sum += float(rewards.sum())
+        reward_square_sum += float(np.square(rewards).sum())
+        played += size
+
+        if target_width is not None:
+            low, high = summarize(wins, draws, losses, reward_sum, reward_square_sum, confidence)[interval]
+            if high - low <= target_width:
+                stopped = "target_width"
+                break
+        if threshold is not None:
+            low, high = summarize(wins, draws, losses, reward_sum, reward_square_sum, test_confidence)[interval]
+            if low > threshold or high < threshold:
+                stopped = "threshold"
+                decision = "above" if low > threshold else "below"
+                break
+
+    result = summarize(wins, draws, losses, reward_sum, reward_square_sum, confidence)
+    result["stopped"] = stopped
+    result["decision"] = decision
+    return result
+
+
+def evaluate_snapshots(tasks, done, n_games, batch_size, confidence, options):
+    """
+    Background process loop evaluating policy snapshots until it receives None
+    :param tasks: queue of (iteration, policy, seed) snapshots
+    :param done: queue the (iteration, result) pairs are put on, a failed evaluation puts its traceback as text
+    :param options: dictionary of the target_width, threshold, metric, decks and penetration arguments of
+                    evaluate_policy
+    """
+    for iteration, policy, seed in iter(tasks.get, None):
+        try:
+            done.put((iteration, evaluate_policy(policy, n_games, seed, batch_size, confidence, **options)))
+        except Exception:
+            done.put((iteration, traceback.format_exc()))
+
+
+class BackgroundEvaluator:
+    """
+    This class evaluates policy snapshots in a background process while training continues. Pass its submit method
+    as the callback of Controller.learn, then collect the learning curve with results()
+
+    Constructor takes:
+    n_games = number of games every snapshot is evaluated on, the most played when stopping early
+    seed = optional seed, every snapshot gets an independent stream from it
+    batch_size, confidence, target_width, threshold, metric, decks, penetration = as for evaluate_policy
+    """
+
+    def __init__(self, n_games, seed=None, batch_size=100000, confidence=0.95, target_width=None, threshold=None,
+                 metric="loss_rate", decks=0, penetration=0.75):
+        """ Constructor """
+        check_settings(n_games, batch_size, confidence, target_width, threshold, metric, decks, penetration)
+        context = multiprocessing.get_context()
+        self.rng = RandomStream.RandomStream(seed)
+        self.tasks = context.Queue()
+        self.done = context.Queue()
+        self.submitted = 0
+        options = {"target_width": target_width, "threshold": threshold, "metric": metric, "decks": decks,
+                   "penetration": penetration}
+        self.process = context.Process(target=evaluate_snapshots,
+                                       args=(self.tasks, self.done, n_games, batch_size, confidence, options),
+                                       daemon=True)
+        self.process.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # don't wait for the queued snapshots if training failed
+        if exc_type is not None:
+            self.process.terminate()
+        self.close()
+
+    def submit(self, iteration, policy, values=None):
+        """
+        Queue a policy snapshot for evaluation, matching the Controller.learn callback
+        :param iteration: training iteration of the snapshot
+        :param policy: policy map P
+        :param values: Q map, not needed for the evaluation
+        :return: None
+        """
+        self.tasks.put((iteration, np.asarray(policy), self.rng.spawn(1)[0].seedSequence))
+        self.submitted += 1
+
+    def results(self):
+        """
+        Wait for every submitted snapshot to be evaluated. Raises RuntimeError if an evaluation failed or the
+        evaluation process stopped, rather than waiting for results that will never come
+        :return: list of (iteration, result) sorted by iteration, results as returned by evaluate_policy
+        """
+        expected = self.submitted
+        self.submitted = 0
+        collected = []
+        while len(collected) < expected:
+            try:
+                iteration, result = self.done.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError("The evaluation process exited with code " + str(self.process.exitcode) +
+                                       " before evaluating every snapshot")
+                continue
+            if isinstance(result, str):
+                raise RuntimeError("Evaluating the snapshot of iteration " + str(iteration) + " failed:\n" + result)
+            collected.append((iteration, result))
+        return sorted(collected, key=lambda item: item[0])
+
+    def close(self):
+        """ Stop the background process """
+        if self.process.is_alive():
+            self.tasks.put(None)
+            self.process.join()
@@ -3,7 +3,7 @@
 # Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
 # Model class creates a Blackjack game with simplified rules
 
-import random
+import RandomStream
 
 ##############################################################################
 # HAND CLASS                                                                 #
@@ -13,8 +13,14 @@ class Hand:
     suit = ['H', 'S', 'D', 'C']
     card = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'K', 'Q', 'A']
 
-    def __init__(self):
-        """ Constructor """
+    def __init__(self, rng=None, shoe=None):
+        """
+        Constructor
+        :param rng: RandomStream the cards are drawn from, a shared default stream if not given
+        :param shoe: optional Shoe the cards are dealt from instead
+        """
+        self.rng = rng if rng is not None else RandomStream.default_stream()
+        self.shoe = shoe
         self.hand = []
         self.hand_sum = 0
         self.number_of_aces = 0
@@ -70,10 +76,13 @@ class Hand:
 
         for i in range(0, number_of_cards):
 
-            # if a card isn't specified, choose an index randomly
+            # if a card isn't specified, deal one from the shoe or choose an index randomly
             if suit_index is None or card_index is None:
-                suit_index = random.randint(0, len(self.suit) - 1)
-                card_index = random.randint(0, len(self.card) - 1)
+                if self.shoe is not None:
+                    suit_index, card_index = self.shoe.draw()
+                else:
+                    suit_index = self.rng.suit()
+                    card_index = self.rng.card()
 
             # if it's an ace, record it
             if self.card[card_index] == 'A':
@@ -92,6 +101,15 @@ class Hand:
             if len(self.hand) == 1:
                 self.first_value = self.get_value()
 
+    def resolve(self, hand_sum):
+        """
+        Finish the hand at a final value without drawing its cards, used with a DealerTable
+        :param hand_sum: final value of the hand, over 21 for a bust
+        """
+        self.hand_sum = hand_sum
+        self.bust = hand_sum > 21
+        self.terminal_hand = True
+
     def set_terminal_hand(self):
         """ Sets the hand as no longer actionable"""
         self.terminal_hand = True
@@ -126,15 +144,30 @@ class Hand:
 class Model:
     """ This class is our model of the game Blackjack """
 
-    def __init__(self):
-        """ Constructor """
+    def __init__(self, rng=None, dealer_table=None, shoe=None):
+        """
+        Constructor
+        :param rng: RandomStream the cards are drawn from, a new unseeded stream if not given
+        :param dealer_table: optional DealerTable which resolves the dealer's turn in one action
+        :param shoe: optional Shoe both hands are dealt from, otherwise every card is drawn independently
+        """
+        # the dealer table's outcomes assume independent cards
+        if dealer_table is not None and shoe is not None:
+            raise ValueError("A dealer table can't be used with a shoe")
+        self.rng = rng if rng is not None else RandomStream.RandomStream()
+        self.dealerTable = dealer_table
+        self.shoe = shoe
+
         # model is running and it's currently the player's turn
         self.isRunning = True
         self.playerTurn = True
 
+        # reward of a game scored by the DealerTable's expected reward
+        self.expectedReward = None
+
         # create hand for dealer and player
-        self.dealerHand = Hand()
-        self.playerHand = Hand()
+        self.dealerHand = Hand(self.rng, self.shoe)
+        self.playerHand = Hand(self.rng, self.shoe)
 
         # add one card for the dealer, and two for the dealer
         self.dealerHand.add_card(1)
@@ -144,11 +177,24 @@ class Model:
         """ Reinitializes the model """
         self.isRunning = True
         self.playerTurn = True
-        self.dealerHand = Hand()
-        self.playerHand = Hand()
+        self.expectedReward = None
+        if self.shoe is not None:
+            self.shoe.start_game()
+        self.dealerHand = Hand(self.rng, self.shoe)
+        self.playerHand = Hand(self.rng, self.shoe)
         self.dealerHand.add_card(1)
         self.playerHand.add_card(2)
 
+    def set_player_hand(self, hand_sum, number_of_aces=None):
+        """
+        Overwrite the value of the player's hand, used for exploring starts
+        :param hand_sum: the new sum of the player's hand
+        :param number_of_aces: optionally the new number of aces counted as 11, otherwise it is kept
+        """
+        self.playerHand.hand_sum = hand_sum
+        if number_of_aces is not None:
+            self.playerHand.number_of_aces = number_of_aces
+
     def do_player_action(self, action):
         """
         Does one player action
@@ -188,6 +234,18 @@ class Model:
         if self.playerTurn or not self.isRunning or self.dealerHand.is_bust():
             return
 
+        # with a dealer table the whole turn is one draw of the final total, or no draw at all for expected rewards
+        if self.dealerTable is not None:
+            if self.dealerTable.expected:
+                self.expectedReward = self.dealerTable.expected_reward(self.playerHand.get_value(),
+                                                                       self.dealerHand.first_value,
+                                                                       2 if self.playerHand.is_double_down() else 1)
+                self.dealerHand.set_terminal_hand()
+            else:
+                self.dealerHand.resolve(self.dealerTable.sample(self.dealerHand.first_value))
+            self.isRunning = False
+            return
+
         # if this is the first action, always hit to emulate one face down card
         if len(self.dealerHand.hand) == 1:
             self.dealerHand.add_card(1)
@@ -215,6 +273,10 @@ class Model:
         if self.isRunning:
             return 0
 
+        # the dealer table scored the game
+        if self.expectedReward is not None:
+            return self.expectedReward
+
         # draw
         if self.playerHand.is_21() and self.dealerHand.is_21():
             return 0
@@ -255,3 +317,238 @@ class Model:
 
         dealer_element = self.dealerHand.first_value
         return [player_element, dealer_element]
+
+##############################################################################
+# FAST MODEL CLASS                                                           #
+##############################################################################
+
+# value of every entry of Hand.card, an ace counts as 11 until it has to be reduced
+CARD_VALUES = [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11]
+
+# phases of a FastModel game
+PLAYER_PHASE = 0
+DEALER_PHASE = 1
+FINISHED = 2
+
+
+def add_card_value(hand_sum, aces, value):
+    """
+    Add a card to a hand the same way Hand.update_sum does
+    :param hand_sum: current sum of the hand
+    :param aces: number of aces counted as 11
+    :param value: value of the new card, 11 for an ace
+    :return: the new sum and number of aces counted as 11
+    """
+    hand_sum += value
+    if value == 11:
+        aces += 1
+    while hand_sum > 21 and aces > 0:
+        hand_sum -= 10
+        aces -= 1
+    return hand_sum, aces
+
+
+def final_reward(player_sum, multiplier, dealer_sum):
+    """
+    Reward of a game where the player did not bust, with the same rules as Model.get_reward
+    :param player_sum: final sum of the player's hand
+    :param multiplier: 2 if the player has doubled down, otherwise 1
+    :param dealer_sum: final sum of the dealer's hand
+    :return: reward
+    """
+    if player_sum == 21 and dealer_sum == 21:
+        return 0
+    if player_sum == 21:
+        return 1.5 * multiplier
+    if dealer_sum == 21:
+        return -1 * multiplier
+    if dealer_sum > 21:
+        return 1 * multiplier
+    if dealer_sum > player_sum:
+        return -1 * multiplier
+    if dealer_sum < player_sum:
+        return 1 * multiplier
+    return 0
+
+
+def fast_step(key, action, value):
+    """
+    Find the state following a FastModel state
+    :param key: state tuple, ("P", player sum, aces, upcard) on the player's turn,
+                ("D", player element, multiplier, dealer sum, dealer aces, upcard) on the dealer's turn
+                or ("F", player element, upcard, reward) when the game is over
+    :param action: 0 means hit, 1 means stand, 2 means double-down, ignored outside the player's turn
+    :param value: value of the card drawn, ignored when no card is drawn
+    :return: the following state tuple
+    """
+    if key[0] == "P":
+        player_sum, aces, upcard = key[1:]
+        element = player_sum + (100 if aces > 0 else 0)
+
+        # stand hands over to the dealer, who has only the upcard so far
+        if action == 1:
+            return "D", element, 1, upcard, (1 if upcard == 11 else 0), upcard
+
+        player_sum, aces = add_card_value(player_sum, aces, value)
+        multiplier = 2 if action == 2 else 1
+        if player_sum > 21:
+            return "F", player_sum, upcard, -1 * multiplier
+        element = player_sum + (100 if aces > 0 else 0)
+        if action == 2:
+            return "D", element, 2, upcard, (1 if upcard == 11 else 0), upcard
+        return "P", player_sum, aces, upcard
+
+    if key[0] == "D":
+        element, multiplier, dealer_sum, dealer_aces, upcard = key[1:]
+
+        # the dealer hits on <17, the upcard alone is always below 17 so the face down card is drawn too
+        dealer_sum, dealer_aces = add_card_value(dealer_sum, dealer_aces, value)
+        if dealer_sum >= 17:
+            player_sum = element - 100 if element > 100 else element
+            return "F", element, upcard, final_reward(player_sum, multiplier, dealer_sum)
+        return "D", element, multiplier, dealer_sum, dealer_aces, upcard
+
+    return key
+
+
+def build_fast_tables():
+    """
+    Enumerate every FastModel state and precompute the tables used to play it
+    :return: dictionary of the state keys, their index, the (state, action, card) transition table, and for every
+             state its phase, reward and get_state_rl() state, plus the starting state of every first three cards
+    """
+    keys = []
+    index = {}
+
+    def state(key):
+        if key not in index:
+            index[key] = len(keys)
+            keys.append(key)
+        return index[key]
+
+    # every player state, including the ones only exploring starts create
+    for upcard in range(2, 12):
+        for player_sum in range(2, 22):
+            for aces in range(3):
+                state(("P", player_sum, aces, upcard))
+
+    transitions = []
+    position = 0
+    while position < len(keys):
+        key = keys[position]
+        for action in range(3):
+            for value in CARD_VALUES:
+                transitions.append(state(fast_step(key, action, value)))
+        position += 1
+
+    phases = {"P": PLAYER_PHASE, "D": DEALER_PHASE, "F": FINISHED}
+    rl_states = []
+    for key in keys:
+        if key[0] == "P":
+            rl_states.append((key[1] + (100 if key[2] > 0 else 0), key[3]))
+        else:
+            rl_states.append((key[1], key[-1] if key[0] == "D" else key[2]))
+
+    # the dealer gets the first card, then the player gets two
+    initial = []
+    for first in CARD_VALUES:
+        for second in CARD_VALUES:
+            for third in CARD_VALUES:
+                player_sum, aces = add_card_value(*add_card_value(0, 0, second), third)
+                initial.append(index[("P", player_sum, aces, first)])
+
+    return {"keys": keys,
+            "index": index,
+            "next": transitions,
+            "phase": [phases[key[0]] for key in keys],
+            "reward": [key[3] if key[0] == "F" else 0 for key in keys],
+            "rl_state": rl_states,
+            "initial": initial}
+
+
+class FastModel:
+    """
+    This class is a headless version of Model for training. The whole game state is one integer which moves
+    through a precomputed (state, action, card) table, no hands or card strings are built
+    """
+    tables = None
+
+    def __init__(self, rng=None, shoe=None):
+        """
+        Constructor
+        :param rng: RandomStream the cards are drawn from, a new unseeded stream if not given
+        :param shoe: optional Shoe the cards are dealt from, otherwise every card is drawn independently
+        """
+        self.rng = rng if rng is not None else RandomStream.RandomStream()
+        self.shoe = shoe
+        self.draw_card = shoe.card if shoe is not None else self.rng.card
+
+        # the tables are the same for every FastModel, so only build them once
+        if FastModel.tables is None:
+            FastModel.tables = build_fast_tables()
+        self.keys = FastModel.tables["keys"]
+        self.index = FastModel.tables["index"]
+        self.next = FastModel.tables["next"]
+        self.phase = FastModel.tables["phase"]
+        self.reward = FastModel.tables["reward"]
+        self.rl_state = FastModel.tables["rl_state"]
+        self.initial = FastModel.tables["initial"]
+        self.number_of_cards = len(CARD_VALUES)
+        self.state = 0
+        self.start()
+
+    @property
+    def isRunning(self):
+        """ True until the game is over """
+        return self.phase[self.state] != FINISHED
+
+    @property
+    def playerTurn(self):
+        """ True while it is the player's turn """
+        return self.phase[self.state] == PLAYER_PHASE
+
+    def start(self):
+        """ Reinitializes the model """
+        if self.shoe is not None:
+            self.shoe.start_game()
+        card = self.draw_card
+        self.state = self.initial[(card() * self.number_of_cards + card()) * self.number_of_cards + card()]
+
+    def set_player_hand(self, hand_sum, number_of_aces=None):
+        """
+        Overwrite the value of the player's hand, used for exploring starts
+        :param hand_sum: the new sum of the player's hand
+        :param number_of_aces: optionally the new number of aces counted as 11, otherwise it is kept
+        """
+        phase, player_sum, aces, upcard = self.keys[self.state]
+        if number_of_aces is not None:
+            aces = number_of_aces
+        self.state = self.index[(phase, hand_sum, aces, upcard)]
+
+    def do_player_action(self, action):
+        """
+        Does one player action
+        :param action: 0 means hit, 1 means stand, 2 means double-down
+        """
+        if self.phase[self.state] != PLAYER_PHASE:
+            return
+        card = 0 if action == 1 else self.draw_card()
+        self.state = self.next[(self.state * 3 + action) * self.number_of_cards + card]
+
+    def do_dealer_action(self):
+        """ Do one dealer action """
+        if self.phase[self.state] != DEALER_PHASE:
+            return
+        self.state = self.next[self.state * 3 * self.number_of_cards + self.draw_card()]
+
+    def get_reward(self):
+        """
+        Return the reward associated with this game state
+        :return: 0 if draw or game is still active, +1 player win, -1 dealer win
+        returns are doubled if player has 'doubled-down'
+        """
+        return self.reward[self.state]
+
+    def get_state_rl(self):
+        """ Get the game state representation for the RL algorithm """
+        return self.rl_state[self.state]
@@ -0,0 +1,49 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# ModelFactory builds the game model of a run from its settings, and reads the settings back off a model
+
+import Model
+import DealerTable
+import Shoe
+
+MODELS = {"Model": Model.Model, "FastModel": Model.FastModel}
+DEALER_TABLES = ["none", "sample", "expected"]
+
+
+def model_factory(model_name, dealer_table="none", decks=0, penetration=0.75):
+    """
+    Get the function building the game model of a run
+    :param model_name: key of MODELS
+    :param dealer_table: "none" to play the dealer card by card, "sample" or "expected" to use a DealerTable
+    :param decks: number of decks of a Shoe to deal from, 0 to draw every card independently
+    :param penetration: fraction of the shoe dealt before reshuffling
+    :return: function of a RandomStream returning a model
+    """
+    if decks > 0:
+        if dealer_table != "none":
+            raise ValueError("A dealer table can't be used with a shoe")
+        return lambda rng: MODELS[model_name](rng, shoe=Shoe.Shoe(rng, decks, penetration))
+    if dealer_table == "none":
+        return MODELS[model_name]
+    if model_name != "Model":
+        raise ValueError("Dealer tables are only supported by Model")
+    return lambda rng: Model.Model(rng, DealerTable.DealerTable(rng, expected=dealer_table == "expected"))
+
+
+def model_settings(model):
+    """
+    Get the model_factory arguments that build a model like the given one: the same model class, dealer table
+    and shoe, e.g. so parallel workers play the same game as their controller
+    :param model: model to describe
+    :return: dictionary of model_factory keyword arguments
+    """
+    model_name = type(model).__name__
+    if model_name not in MODELS:
+        raise ValueError("Can't rebuild a model of type " + model_name)
+    dealer_table = getattr(model, "dealerTable", None)
+    shoe = model.shoe
+    return {"model_name": model_name,
+            "dealer_table": "none" if dealer_table is None else "expected" if dealer_table.expected else "sample",
+            "decks": 0 if shoe is None else shoe.numberOfDecks,
+            "penetration": 0.75 if shoe is None else shoe.penetration}
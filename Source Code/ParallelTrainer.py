@@ -0,0 +1,161 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# ParallelTrainer splits a Controller's training across a pool of worker processes
+
+import multiprocessing
+import numpy as np
+import Controller
+import ModelFactory
+import RandomStream
+import Tables
+
+def merge_tables(q_slots, n_slots):
+    """
+    Merge the Q maps of several workers, weighting every entry by its visit count
+    :param q_slots: array of Q maps, one per worker on the first axis
+    :param n_slots: array of N maps, one per worker on the first axis
+    :return: merged Q map
+    """
+    return (q_slots * n_slots).sum(axis=0) / n_slots.sum(axis=0)
+
+
+def split_iterations(num_iterations, num_workers):
+    """
+    Split the number of games to play between the workers
+    :return: list with the number of games for every worker
+    """
+    share, remainder = divmod(num_iterations, num_workers)
+    return [share + (1 if worker < remainder else 0) for worker in range(num_workers)]
+
+
+def controller_settings(controller):
+    """
+    Get the parameters needed to build a worker Controller like the given one
+    :return: dictionary of Controller keyword arguments
+    """
+    return {"aitype": controller.AIType,
+            "action_selector": controller.ActionSelector,
+            "ai_parameter_1": controller.AIParameter,
+            "ai_parameter_2": controller.AIParameter2,
+            "selector_parameter": controller.SelectorParameter,
+            "use_average_update": controller.useAverageUpdate,
+            "n_step": controller.nStep,
+            "update_batch": controller.updateBatch,
+            "replay_capacity": controller.replayCapacity,
+            "replay_batch": controller.replayBatch}
+
+
+def learn_parallel(controller, num_iterations):
+    """
+    This function plays num_iterations games split across controller.numWorkers processes. Every
+    controller.syncInterval games the workers wait for each other, publish their Q and N maps through shared memory
+    and all continue from the same merge of them, so a seeded run gives the same maps however the processes are
+    scheduled. The merged maps are written back to the controller
+    :param controller: Controller to train
+    :param num_iterations: number of games to play
+    :return: None
+    """
+    num_workers = controller.numWorkers
+    shape = controller.Q.shape
+    context = multiprocessing.get_context()
+
+    # one Q and one N slot per worker, all starting from the controller's maps
+    q_memory = context.RawArray('d', num_workers * controller.Q.size)
+    n_memory = context.RawArray('q', num_workers * controller.N.size)
+    q_slots, n_slots = _attach(q_memory, n_memory, shape, num_workers)
+    q_slots[:] = controller.Q
+    n_slots[:] = controller.N
+
+    barrier = context.Barrier(num_workers)
+    settings = controller_settings(controller)
+    model = ModelFactory.model_settings(controller.model)
+    iterations = split_iterations(num_iterations, num_workers)
+    # every worker takes part in every merge, also once its own share of the games is played
+    syncs = -(-max(iterations) // controller.syncInterval)
+
+    # every worker gets its own independent random stream
+    seeds = [stream.seedSequence for stream in controller.rng.spawn(num_workers)]
+
+    # one process per worker rather than a pool, which could give two workers to one process and block the barrier
+    processes = [context.Process(target=train_worker,
+                                 args=(worker, iterations[worker], seeds[worker], settings, model,
+                                       controller.syncInterval, syncs, barrier, q_memory, n_memory, shape))
+                 for worker in range(num_workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    failed = [worker for worker, process in enumerate(processes) if process.exitcode != 0]
+    if failed:
+        raise RuntimeError("Parallel training failed in workers " + str(failed))
+
+    # every worker started from the controller's counts, so only add the visits they made
+    controller.Q[:] = merge_tables(q_slots, n_slots)
+    controller.N[:] = n_slots.sum(axis=0) - (num_workers - 1) * controller.N
+    controller.P[:] = Tables.greedy_policy(controller.Q)
+    if controller.ucbSelector is not None:
+        controller.ucbSelector.rebuild()
+    return
+
+
+def train_worker(worker, num_iterations, seed, settings, model, sync_interval, syncs, barrier, q_memory, n_memory,
+                 shape):
+    """
+    Play this worker's share of the games, merging with the other workers every sync_interval games
+    :param worker: index of this worker's slot in the shared tables
+    :param num_iterations: number of games to play
+    :param seed: SeedSequence of this worker's RandomStream
+    :param settings: Controller keyword arguments
+    :param model: ModelFactory.model_factory keyword arguments of the game model, see ModelFactory.model_settings
+    :param sync_interval: number of games between merges
+    :param syncs: number of merges, the same for every worker
+    :param barrier: Barrier of all the workers
+    :param q_memory: shared memory of the Q slots
+    :param n_memory: shared memory of the N slots
+    :param shape: shape of a Q map
+    :return: None
+    """
+    try:
+        _train_worker(worker, num_iterations, seed, settings, model, sync_interval, syncs, barrier,
+                      *_attach(q_memory, n_memory, shape, barrier.parties))
+    except BaseException:
+        # release the other workers instead of leaving them waiting for this one
+        barrier.abort()
+        raise
+    return
+
+
+def _train_worker(worker, num_iterations, seed, settings, model, sync_interval, syncs, barrier, q_slots, n_slots):
+    """ Body of train_worker, working on numpy views of the shared tables """
+    rng = RandomStream.RandomStream(seed)
+    c = Controller.Controller(model=ModelFactory.model_factory(**model)(rng), num_iterations=0, rng=rng, **settings)
+    c.Q[:] = q_slots[worker]
+    c.N[:] = n_slots[worker]
+    c.P[:] = Tables.greedy_policy(c.Q)
+    if c.ucbSelector is not None:
+        c.ucbSelector.rebuild()
+
+    played = 0
+    for _ in range(syncs):
+        chunk = min(sync_interval, num_iterations - played)
+        if chunk > 0:
+            c.learn(chunk)
+            played += chunk
+
+        # publish our maps once everyone is done reading the last merge, then merge every slot in the same order
+        q_slots[worker] = c.Q
+        n_slots[worker] = c.N
+        barrier.wait()
+        merged = merge_tables(q_slots, n_slots)
+        barrier.wait()
+        c.Q[:] = merged
+        c.P[:] = Tables.greedy_policy(c.Q)
+    return
+
+
+def _attach(q_memory, n_memory, shape, num_workers):
+    """ Get numpy views of the shared Q and N slots """
+    q_slots = np.frombuffer(q_memory, dtype=np.float64).reshape((num_workers,) + shape)
+    n_slots = np.frombuffer(n_memory, dtype=np.int64).reshape((num_workers,) + shape)
+    return q_slots, n_slots
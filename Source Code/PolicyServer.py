@@ -0,0 +1,156 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# PolicyServer answers which action a trained policy plays in a state, locally or over HTTP
+
+import argparse
+import http.server
+import json
+import os
+import sys
+import urllib.parse
+import numpy as np
+import PolicyStore
+import StateIndex
+import Tables
+
+
+def compile_policy(table):
+    """
+    Compile a policy or value map into a flat table of greedy actions, the first best action on ties
+    :param table: P or Q map (nested lists or array), of the dense or the get_state_rl() layout
+    :return: uint8 array of actions indexed player element * dealer size + dealer element, in the get_state_rl()
+             layout so the models' states need no conversion
+    """
+    table = StateIndex.legacy_table(Tables.as_table(table))
+    return Tables.greedy_actions(table).astype(np.uint8).ravel()
+
+
+class PolicyServer:
+    """
+    This class holds a policy compiled into one byte per state, so looking up an action is a single index
+
+    Constructor takes:
+    table = P or Q map, of the dense or the get_state_rl() layout
+    """
+
+    def __init__(self, table):
+        """ Constructor """
+        table = StateIndex.legacy_table(Tables.as_table(table))
+        self.mapSize, self.dealerSize = table.shape[:2]
+        self.table = compile_policy(table)
+        # indexing bytes is the cheapest scalar lookup python has
+        self.lookup = self.table.tobytes()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Build a server from a saved policy, a PolicyStore file or a legacy pickle
+        :param path: file to load
+        :return: PolicyServer
+        """
+        if path.endswith(".dat"):
+            return cls(PolicyStore.load_legacy(path))
+        return cls(PolicyStore.load_policy(path))
+
+    def action(self, state):
+        """
+        Get the action played in one state
+        :param state: (player element, dealer element) as returned by get_state_rl()
+        :return: action
+        """
+        return self.lookup[state[0] * self.dealerSize + state[1]]
+
+    def actions(self, players, dealers):
+        """
+        Get the actions played in many states at once
+        :param players: array of player elements
+        :param dealers: array of dealer elements
+        :return: uint8 array of actions
+        """
+        players = np.asarray(players, dtype=np.int64)
+        dealers = np.asarray(dealers, dtype=np.int64)
+        if np.any((players < 0) | (players >= self.mapSize) | (dealers < 0) | (dealers >= self.dealerSize)):
+            raise IndexError("State out of range of the policy table")
+        return self.table[players * self.dealerSize + dealers]
+
+
+#####
+# HTTP endpoint
+# GET  /action?player=<p>&dealer=<d>            -> {"action": a}
+# POST /actions {"states": [[p, d], ...]}       -> {"actions": [a, ...]}
+#####
+
+class PolicyRequestHandler(http.server.BaseHTTPRequestHandler):
+    """ Request handler answering from the server's policy attribute """
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != "/action":
+            self.send_error(404)
+            return
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            state = (int(query["player"][0]), int(query["dealer"][0]))
+            action = int(self.server.policy.actions([state[0]], [state[1]])[0])
+        except (KeyError, ValueError, IndexError) as error:
+            self.send_error(400, str(error))
+            return
+        self.send_json({"action": action})
+
+    def do_POST(self):
+        if self.path != "/actions":
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            states = np.asarray(json.loads(self.rfile.read(length))["states"], dtype=np.int64).reshape(-1, 2)
+            actions = self.server.policy.actions(states[:, 0], states[:, 1])
+        except (KeyError, ValueError, TypeError, IndexError) as error:
+            self.send_error(400, str(error))
+            return
+        self.send_json({"actions": actions.tolist()})
+
+    def send_json(self, content):
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # a line per request would cost more than answering it
+        return
+
+
+def make_server(policy, host="127.0.0.1", port=8000):
+    """
+    Create the HTTP server for a policy, call serve_forever() on it to start answering
+    :param policy: PolicyServer to answer from
+    :return: ThreadingHTTPServer
+    """
+    server = http.server.ThreadingHTTPServer((host, port), PolicyRequestHandler)
+    server.policy = policy
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the actions of a saved policy over HTTP")
+    parser.add_argument("policy", help="policy file, from Controller.save or a legacy .dat pickle")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    server = make_server(PolicyServer.from_file(args.policy), args.host, args.port)
+    print("Serving", os.path.basename(args.policy), "on http://%s:%d" % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
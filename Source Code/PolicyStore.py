@@ -0,0 +1,242 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# PolicyStore saves and loads the Q, P and N maps of a Controller in a versioned binary format
+
+import argparse
+import os
+import pickle
+import struct
+import sys
+import numpy as np
+import StateIndex
+import Tables
+
+#####
+# File layout: a fixed HEADER_SIZE byte header, followed by the raw C-ordered arrays that are present, in the order
+# of ARRAYS. Every value is little endian, and every array starts on an 8 byte boundary so it can be memory mapped
+#####
+
+MAGIC = b"BJTABLES"
+VERSION = 1
+HEADER_SIZE = 128
+
+# magic, version, present arrays, map size, dealer size, number of actions, algorithm, action selector,
+# ai parameter 1, ai parameter 2, selector parameter, use average update, iterations, converged at (-1 for none)
+HEADER_FORMAT = "<8sHHIII8s8sddd?7xqq"
+
+# name, dtype and presence bit of every array, in file order
+ARRAYS = [("Q", np.dtype("<f8"), 1),
+          ("P", np.dtype("<f8"), 2),
+          ("N", np.dtype("<i8"), 4)]
+
+
+def pack_header(header):
+    """
+    Build the header bytes
+    :param header: dictionary as returned by read_header
+    :return: bytes of length HEADER_SIZE
+    """
+    present = sum(bit for name, dtype, bit in ARRAYS if name in header["arrays"])
+    converged_at = header["converged_at"]
+    packed = struct.pack(HEADER_FORMAT,
+                         MAGIC,
+                         VERSION,
+                         present,
+                         *header["shape"],
+                         header["aitype"].encode("ascii"),
+                         header["action_selector"].encode("ascii"),
+                         header["ai_parameter_1"],
+                         header["ai_parameter_2"],
+                         header["selector_parameter"],
+                         header["use_average_update"],
+                         header["iterations"],
+                         -1 if converged_at is None else converged_at)
+    return packed.ljust(HEADER_SIZE, b"\0")
+
+
+def unpack_header(data):
+    """
+    Parse the header bytes
+    :param data: first HEADER_SIZE bytes of a file
+    :return: dictionary of the header fields
+    """
+    if len(data) < HEADER_SIZE or data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a policy table file")
+    fields = struct.unpack_from(HEADER_FORMAT, data)
+    if fields[1] != VERSION:
+        raise ValueError("Unsupported policy table file version " + str(fields[1]))
+    return {"arrays": [name for name, dtype, bit in ARRAYS if fields[2] & bit],
+            "shape": fields[3:6],
+            "aitype": fields[6].rstrip(b"\0").decode("ascii"),
+            "action_selector": fields[7].rstrip(b"\0").decode("ascii"),
+            "ai_parameter_1": fields[8],
+            "ai_parameter_2": fields[9],
+            "selector_parameter": fields[10],
+            "use_average_update": fields[11],
+            "iterations": fields[12],
+            "converged_at": None if fields[13] < 0 else fields[13]}
+
+
+def array_offsets(header):
+    """
+    Get where every present array starts in the file
+    :return: dictionary of name to (offset, dtype), and the total file size
+    """
+    count = int(np.prod(header["shape"]))
+    offsets = {}
+    offset = HEADER_SIZE
+    for name, dtype, bit in ARRAYS:
+        if name in header["arrays"]:
+            offsets[name] = (offset, dtype)
+            offset += count * dtype.itemsize
+    return offsets, offset
+
+
+def controller_header(controller):
+    """
+    Build the header describing a Controller's maps
+    :return: dictionary of the header fields
+    """
+    return {"arrays": ["Q", "P", "N"],
+            "shape": controller.Q.shape,
+            "aitype": controller.AIType,
+            "action_selector": controller.ActionSelector,
+            "ai_parameter_1": float(controller.AIParameter),
+            "ai_parameter_2": float(controller.AIParameter2),
+            "selector_parameter": float(controller.SelectorParameter),
+            "use_average_update": bool(controller.useAverageUpdate),
+            "iterations": controller.episodesPlayed,
+            "converged_at": controller.convergedAt}
+
+
+def write(path, header, tables):
+    """
+    Write a new file, replacing any file at path only once it is complete
+    :param path: file to write
+    :param header: dictionary of the header fields, its arrays entry lists the tables written
+    :param tables: dictionary of name to array, for every name in header["arrays"]
+    :return: None
+    """
+    offsets, size = array_offsets(header)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(pack_header(header))
+        for name, dtype, bit in ARRAYS:
+            if name in offsets:
+                f.write(np.ascontiguousarray(tables[name], dtype=dtype).tobytes())
+    os.replace(temporary, path)
+
+
+def save(path, controller):
+    """
+    Save a Controller's maps. When path already holds maps of the same layout they are overwritten in place, so
+    saving a checkpoint repeatedly during training costs no more than copying the arrays
+    :param path: file to write
+    :param controller: Controller to save
+    :return: None
+    """
+    header = controller_header(controller)
+    tables = {"Q": controller.Q, "P": controller.P, "N": controller.N}
+
+    try:
+        current = read_header(path)
+    except (OSError, ValueError):
+        current = None
+    if current is None or current["arrays"] != header["arrays"] or tuple(current["shape"]) != tuple(header["shape"]):
+        write(path, header, tables)
+        return
+
+    # copy the arrays first and the header last, so that the iteration count never runs ahead of the data
+    offsets, size = array_offsets(header)
+    for name, (offset, dtype) in offsets.items():
+        mapped = np.memmap(path, dtype=dtype, mode="r+", offset=offset, shape=tuple(header["shape"]))
+        mapped[:] = tables[name]
+        mapped.flush()
+        del mapped
+    with open(path, "r+b") as f:
+        f.write(pack_header(header))
+
+
+def read_header(path):
+    """
+    Read the header of a file
+    :return: dictionary of the header fields
+    """
+    with open(path, "rb") as f:
+        return unpack_header(f.read(HEADER_SIZE))
+
+
+def load(path, mode="r"):
+    """
+    Memory map the arrays of a file, nothing is read until an entry is used
+    :param path: file to load
+    :param mode: numpy.memmap mode, "r" for read only, "r+" to write through to the file or "c" for copy on write
+    :return: the header dictionary, and a dictionary of name to mapped array for every present array
+    """
+    header = read_header(path)
+    offsets, size = array_offsets(header)
+    if os.path.getsize(path) < size:
+        raise ValueError("Policy table file " + path + " is truncated")
+    tables = {name: np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=tuple(header["shape"]))
+              for name, (offset, dtype) in offsets.items()}
+    return header, tables
+
+
+def load_policy(path):
+    """
+    Get the policy map of a file, read only
+    :return: mapped policy map P
+    """
+    header, tables = load(path)
+    if "P" not in tables:
+        raise ValueError("Policy table file " + path + " has no policy map")
+    return tables["P"]
+
+
+def load_legacy(path):
+    """
+    Read a policy map pickled by an earlier version. Only use this on files you trust, unpickling runs code
+    :return: policy map P as an array
+    """
+    with open(path, "rb") as f:
+        return Tables.as_table(pickle.load(f))
+
+
+def convert_legacy(pickle_path, path, aitype=""):
+    """
+    Convert a pickled policy map into the binary format, and into the dense layout of StateIndex
+    :param pickle_path: pickled policy map
+    :param path: file to write
+    :param aitype: algorithm recorded in the header
+    :return: None
+    """
+    policy = StateIndex.dense_table(load_legacy(pickle_path))
+    header = {"arrays": ["P"],
+              "shape": policy.shape,
+              "aitype": aitype,
+              "action_selector": "",
+              "ai_parameter_1": 0.0,
+              "ai_parameter_2": 0.0,
+              "selector_parameter": 0.0,
+              "use_average_update": False,
+              "iterations": 0,
+              "converged_at": None}
+    write(path, header, {"P": policy})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert pickled policy maps into the binary policy table format")
+    parser.add_argument("pickles", nargs="+", help="pickled policy maps, e.g. assets/policies/QL.dat")
+    parser.add_argument("--aitype", default="", help="algorithm recorded in the headers")
+    args = parser.parse_args(argv)
+
+    for pickle_path in args.pickles:
+        path = os.path.splitext(pickle_path)[0] + ".bin"
+        convert_legacy(pickle_path, path, args.aitype)
+        print("Wrote", path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
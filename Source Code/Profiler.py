@@ -0,0 +1,122 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Profiler class which counts where a Controller's training time goes
+
+import json
+import time
+
+
+class Profiler:
+    """
+    This class keeps timing counters for the phases of a Controller's training. It is installed by wrapping the
+    Controller's methods on the instance, so a Controller without a Profiler pays nothing for it
+
+    Constructor takes:
+    stats_file = optional path that periodic snapshots are appended to, one JSON object per line
+    interval = number of games between snapshots
+    """
+    # Controller methods that are timed, each time includes the methods it calls
+    PHASES = ["generate_game",
+              "select_action",
+              "select_action_random",
+              "select_action_best",
+              "update_values_mc",
+              "update_values_sarsa",
+              "update_values_ql",
+              "update_values_ql_batch",
+              "update_policy",
+              "apply_updates",
+              "play_dealer_turn"]
+
+    def __init__(self, stats_file=None, interval=20000):
+        """ Constructor """
+        self.times = {}
+        self.calls = {}
+        self.episodes = 0
+        self.steps = 0
+        self.maxSteps = 0
+        self.dealerDraws = 0
+        self.dealerTable = None
+        self.interval = interval
+        self.statsFile = stats_file
+        self.startTime = time.perf_counter()
+
+    def install(self, controller):
+        """
+        Wrap the controller's phases and its model's dealer action with counters
+        :param controller: Controller to profile
+        :return: None
+        """
+        for name in self.PHASES:
+            setattr(controller, name, self.timed(name, getattr(controller, name)))
+
+        # count the episodes and the steps in them
+        generate_game = controller.generate_game
+
+        def counted_generate_game():
+            episode = generate_game()
+            self.episodes += 1
+            self.steps += len(episode)
+            self.maxSteps = max(self.maxSteps, len(episode))
+            return episode
+        controller.generate_game = counted_generate_game
+
+        # count the dealer draws, a dealer table counts the turns it resolved itself
+        self.dealerTable = getattr(controller.model, "dealerTable", None)
+        do_dealer_action = controller.model.do_dealer_action
+
+        def counted_do_dealer_action():
+            self.dealerDraws += 1
+            do_dealer_action()
+        controller.model.do_dealer_action = counted_do_dealer_action
+
+    def timed(self, name, method):
+        """
+        Wrap a method so that its calls and cumulative time are counted under name
+        :return: the wrapped method
+        """
+        times = self.times
+        calls = self.calls
+        clock = time.perf_counter
+        times[name] = 0.0
+        calls[name] = 0
+
+        def wrapper(*args):
+            start = clock()
+            result = method(*args)
+            times[name] += clock() - start
+            calls[name] += 1
+            return result
+        return wrapper
+
+    def stats(self):
+        """
+        Get the current counters
+        :return: dictionary of counters, with the cumulative seconds and number of calls of every phase
+        """
+        episodes = max(self.episodes, 1)
+        return {"elapsed_seconds": time.perf_counter() - self.startTime,
+                "episodes": self.episodes,
+                "steps": self.steps,
+                "steps_per_episode": self.steps / episodes,
+                "max_steps_per_episode": self.maxSteps,
+                "dealer_draws": self.dealerDraws,
+                "dealer_draws_per_episode": self.dealerDraws / episodes,
+                "dealer_table_samples": self.dealerTable.samples if self.dealerTable is not None else 0,
+                "time": dict(self.times),
+                "calls": dict(self.calls)}
+
+    def write_snapshot(self, iteration):
+        """
+        Append the current counters to the stats file. The file is only open while a snapshot is written, so
+        nothing needs closing however long the Controller lives
+        :param iteration: training iteration the snapshot is taken at
+        :return: None
+        """
+        if self.statsFile is None:
+            return
+        snapshot = self.stats()
+        snapshot["iteration"] = iteration
+        with open(self.statsFile, "a") as f:
+            f.write(json.dumps(snapshot) + "\n")
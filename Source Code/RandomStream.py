@@ -0,0 +1,81 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# RandomStream class which hands out seeded random numbers generated in large blocks
+
+import numpy as np
+
+# stream used by Hands created without one
+_default_stream = None
+
+
+def default_stream():
+    """ Returns the stream shared by every Hand that was not given one """
+    global _default_stream
+    if _default_stream is None:
+        _default_stream = RandomStream()
+    return _default_stream
+
+
+class RandomStream:
+    """
+    This class hands out card draws and uniform numbers one at a time, taking them from blocks pre-generated with
+    numpy and refilling a block when it runs out. Two streams built from the same seed give the same numbers
+
+    Constructor takes:
+    seed = integer, numpy SeedSequence, or None to seed from fresh entropy
+    block_size = how many numbers of each kind to generate at once
+    number_of_cards = number of card ranks to draw from
+    number_of_suits = number of suits to draw from
+    """
+
+    def __init__(self, seed=None, block_size=65536, number_of_cards=13, number_of_suits=4):
+        """ Constructor """
+        if isinstance(seed, np.random.SeedSequence):
+            self.seedSequence = seed
+        else:
+            self.seedSequence = np.random.SeedSequence(seed)
+        self.generator = np.random.default_rng(self.seedSequence)
+        self.blockSize = block_size
+        self.numberOfCards = number_of_cards
+        self.numberOfSuits = number_of_suits
+
+        # numbers left in the current blocks, handed out from the end
+        self.cards = []
+        self.suits = []
+        self.uniforms = []
+
+    def spawn(self, count):
+        """
+        Create independent streams, e.g. one for every parallel worker
+        :param count: number of streams
+        :return: list of RandomStreams
+        """
+        return [RandomStream(child, self.blockSize, self.numberOfCards, self.numberOfSuits)
+                for child in self.seedSequence.spawn(count)]
+
+    def card(self):
+        """ Returns a random card index """
+        if not self.cards:
+            self.cards = self.generator.integers(0, self.numberOfCards, self.blockSize).tolist()
+        return self.cards.pop()
+
+    def suit(self):
+        """ Returns a random suit index """
+        if not self.suits:
+            self.suits = self.generator.integers(0, self.numberOfSuits, self.blockSize).tolist()
+        return self.suits.pop()
+
+    def uniform(self):
+        """ Returns a random float in [0, 1) """
+        if not self.uniforms:
+            self.uniforms = self.generator.random(self.blockSize).tolist()
+        return self.uniforms.pop()
+
+    def randint(self, low, high):
+        """ Returns a random integer N such that low <= N <= high """
+        return low + int(self.uniform() * (high - low + 1))
+
+    def choice(self, sequence):
+        """ Returns a random element of a non-empty sequence """
+        return sequence[int(self.uniform() * len(sequence))]
@@ -0,0 +1,65 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# ReplayBuffer keeps the most recent transitions so Q-Learning can learn from each of them more than once
+
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    This class stores transitions in fixed size ring arrays, the oldest transition is overwritten once it is full,
+    so its memory use does not grow with the number of games played
+
+    Constructor takes:
+    capacity = number of transitions kept
+    dealer_size = number of columns of the Controller's maps, states are stored as row * dealer_size + column
+    rng = RandomStream the minibatches are sampled from
+    """
+
+    def __init__(self, capacity, dealer_size, rng):
+        """ Constructor """
+        self.capacity = capacity
+        self.dealerSize = dealer_size
+        self.rng = rng
+        self.states = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.nextStates = np.zeros(capacity, dtype=np.int32)
+        self.done = np.zeros(capacity, dtype=bool)
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, state_next, done):
+        """
+        Store one transition
+        :param state: (row, column) of the Controller's maps the action was taken in
+        :param action:
+        :param reward:
+        :param state_next: state after the action
+        :param done: True if the game ended with the action
+        :return: None
+        """
+        position = self.position
+        self.states[position] = state[0] * self.dealerSize + state[1]
+        self.actions[position] = action
+        self.rewards[position] = reward
+        self.nextStates[position] = state_next[0] * self.dealerSize + state_next[1]
+        self.done[position] = done
+        self.position = (position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Draw a minibatch of stored transitions, uniformly with replacement
+        :param batch_size: number of transitions
+        :return: arrays of rows, columns, actions, rewards, next rows, next columns and done flags
+        """
+        index = self.rng.generator.integers(0, self.size, batch_size)
+        players, dealers = np.divmod(self.states[index], self.dealerSize)
+        players_next, dealers_next = np.divmod(self.nextStates[index], self.dealerSize)
+        return (players, dealers, self.actions[index].astype(np.int64), self.rewards[index].astype(np.float64),
+                players_next, dealers_next, self.done[index])
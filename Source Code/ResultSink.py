@@ -0,0 +1,244 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# ResultSink buffers training and evaluation results and writes them in bulk to one file per kind of record
+
+import csv
+import os
+import time
+import uuid
+
+# fcntl locks the files against other writers, it is missing on Windows where writers have to use separate files
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# pyarrow is only needed for Parquet output
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# one row per run, describing its parameters
+METADATA_FIELDS = ["run_id",
+                   "started",
+                   "aitype",
+                   "action_selector",
+                   "ai_parameter_1",
+                   "ai_parameter_2",
+                   "selector_parameter",
+                   "use_average_update",
+                   "n_step",
+                   "update_batch",
+                   "lower_bound",
+                   "upper_bound",
+                   "iteration_step",
+                   "iteration_step_amount",
+                   "games",
+                   "seed",
+                   "decks",
+                   "penetration"]
+
+# one row per evaluated policy of a run
+CURVE_FIELDS = ["run_id",
+                "iterations",
+                "trained_iterations",
+                "converged_at",
+                "games",
+                "wins",
+                "draws",
+                "losses",
+                "loss_rate",
+                "loss_rate_ci_low",
+                "loss_rate_ci_high",
+                "mean_reward",
+                "reward_ci_low",
+                "reward_ci_high"]
+
+# one row per state of a run's final policy table
+POLICY_FIELDS = ["run_id",
+                 "iterations",
+                 "player",
+                 "soft",
+                 "dealer",
+                 "action"]
+
+FORMATS = ["csv", "parquet"]
+ACTION_STRINGS = ["H", "S", "D"]
+
+
+def new_run_id():
+    """ Returns a run id that is unique across processes and machines """
+    return uuid.uuid4().hex[:16]
+
+
+def curve_record(run_id, iterations, result, trained_iterations=None, converged_at=None):
+    """
+    Flatten an evaluation result into a row of CURVE_FIELDS
+    :param run_id: id of the run
+    :param iterations: iteration milestone the evaluated policy came from
+    :param result: dictionary as returned by Evaluator.evaluate_policy
+    :param trained_iterations: games the Controller had played when the run finished
+    :param converged_at: iteration the Controller converged at, None if it did not
+    :return: dictionary
+    """
+    record = {"run_id": run_id,
+              "iterations": iterations,
+              "trained_iterations": trained_iterations,
+              "converged_at": converged_at,
+              "loss_rate_ci_low": result["loss_rate_ci"][0],
+              "loss_rate_ci_high": result["loss_rate_ci"][1],
+              "reward_ci_low": result["reward_ci"][0],
+              "reward_ci_high": result["reward_ci"][1]}
+    for field in ["games", "wins", "draws", "losses", "loss_rate", "mean_reward"]:
+        record[field] = result[field]
+    return record
+
+
+class ResultStream:
+    """
+    This class buffers the rows of one kind of record and appends them to its file in bulk. CSV files are locked
+    while a buffer is appended, so any number of processes can share them. Parquet files can't be appended to, so
+    every flush writes a new part file into a directory instead
+
+    Constructor takes:
+    path = file path without extension
+    fields = columns of the rows, in order
+    buffer_rows = number of rows buffered between writes
+    file_format = "csv" or "parquet"
+    """
+
+    def __init__(self, path, fields, buffer_rows=10000, file_format="csv"):
+        """ Constructor """
+        if file_format == "parquet" and pyarrow is None:
+            raise ValueError("Parquet output requires pyarrow")
+        if file_format not in FORMATS:
+            raise ValueError("Unknown result format " + str(file_format))
+        self.path = path
+        self.fields = fields
+        self.bufferRows = buffer_rows
+        self.fileFormat = file_format
+        self.rows = []
+
+    def write(self, row):
+        """
+        Buffer one row
+        :param row: dictionary with an entry for every field, missing entries are left empty
+        :return: None
+        """
+        extra = set(row) - set(self.fields)
+        if extra:
+            raise ValueError("Fields not in the schema of " + self.path + ": " + ", ".join(sorted(extra)))
+        self.rows.append(row)
+        if len(self.rows) >= self.bufferRows:
+            self.flush()
+
+    def flush(self):
+        """ Write the buffered rows """
+        if not self.rows:
+            return
+        if self.fileFormat == "csv":
+            self.flush_csv()
+        else:
+            self.flush_parquet()
+        self.rows = []
+
+    def flush_csv(self):
+        """
+        Append the buffered rows to the CSV file, with the header if the file is new. Raises ValueError if the file
+        has other columns, e.g. from an older version of the fields, rather than appending rows that don't match them
+        """
+        with open(self.path + ".csv", "a+", newline="") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            writer = csv.DictWriter(f, fieldnames=self.fields)
+            # another writer may have created the file since it was opened, so only check for the header now
+            f.seek(0)
+            header = next(csv.reader(f), None)
+            if header is None:
+                writer.writeheader()
+            elif header != self.fields:
+                raise ValueError(self.path + ".csv has the columns " + ", ".join(header) + ", expected " +
+                                 ", ".join(self.fields) + ". Write to another directory")
+            writer.writerows(self.rows)
+            f.flush()
+
+    def flush_parquet(self):
+        """ Write the buffered rows to a new part file of the Parquet directory """
+        os.makedirs(self.path, exist_ok=True)
+        columns = {field: [row.get(field) for row in self.rows] for field in self.fields}
+        part = os.path.join(self.path, "part-" + str(os.getpid()) + "-" + uuid.uuid4().hex[:8] + ".parquet")
+        pyarrow.parquet.write_table(pyarrow.table(columns), part)
+
+
+class ResultSink:
+    """
+    This class writes the results of training runs to separate streams in a directory: metadata with one row
+    per run, curve with one row per evaluated policy, and policy with one row per state of the final policies
+
+    Constructor takes:
+    directory = directory the files are written to, created if needed
+    buffer_rows = number of rows every stream buffers between writes
+    file_format = "csv" or "parquet"
+    """
+
+    def __init__(self, directory, buffer_rows=10000, file_format="csv"):
+        """ Constructor """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.metadata = ResultStream(os.path.join(directory, "metadata"), METADATA_FIELDS, buffer_rows, file_format)
+        self.curve = ResultStream(os.path.join(directory, "curve"), CURVE_FIELDS, buffer_rows, file_format)
+        self.policy = ResultStream(os.path.join(directory, "policy"), POLICY_FIELDS, buffer_rows, file_format)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_metadata(self, record):
+        """
+        Record the parameters of a run
+        :param record: dictionary of METADATA_FIELDS, started defaults to now
+        :return: None
+        """
+        record = dict(record)
+        record.setdefault("started", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self.metadata.write(record)
+
+    def write_curve(self, record):
+        """
+        Record the evaluation of one policy, see curve_record
+        :return: None
+        """
+        self.curve.write(record)
+
+    def write_policy(self, run_id, iterations, policy):
+        """
+        Record the action of every hard and soft player state against every upcard
+        :param run_id: id of the run
+        :param iterations: iteration the policy came from
+        :param policy: PolicyServer of the policy
+        :return: None
+        """
+        for soft, players in [(False, range(2, 22)), (True, range(112, 122))]:
+            for player in players:
+                for dealer in range(2, 12):
+                    self.policy.write({"run_id": run_id,
+                                       "iterations": iterations,
+                                       "player": player - 100 if soft else player,
+                                       "soft": soft,
+                                       "dealer": dealer,
+                                       "action": ACTION_STRINGS[policy.action((player, dealer))]})
+
+    def flush(self):
+        """ Write everything buffered """
+        self.metadata.flush()
+        self.curve.flush()
+        self.policy.flush()
+
+    def close(self):
+        """ Write everything buffered, the sink can still be written to afterwards """
+        self.flush()
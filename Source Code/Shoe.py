@@ -0,0 +1,95 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Shoe class deals from a finite, shuffled multi-deck shoe instead of drawing every card independently
+
+import numpy as np
+
+NUMBER_OF_CARDS = 13
+NUMBER_OF_SUITS = 4
+
+# Hi-Lo count of every entry of Hand.card: 2 to 6 count +1, 7 to 9 count 0, tens and aces count -1
+HI_LO = np.array([1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1, -1])
+
+
+class Shoe:
+    """
+    This class holds every card of the shoe shuffled in one array, and deals by moving a cursor along it. The
+    shoe is reshuffled in one go when a game starts past the cut card, or if it runs out during a game. Everything
+    per card, including the running count after it, is worked out for the whole shoe when it is shuffled, so
+    dealing only reads the entry under the cursor
+
+    Constructor takes:
+    rng = RandomStream used for the shuffles
+    number_of_decks = number of 52 card decks in the shoe
+    penetration = fraction of the shoe dealt before the cut card
+
+    Other attributes:
+    shuffles counts the shuffles
+    """
+
+    def __init__(self, rng, number_of_decks=6, penetration=0.75):
+        """ Constructor """
+        if number_of_decks < 1:
+            raise ValueError("A shoe needs at least one deck")
+        if not 0 < penetration <= 1:
+            raise ValueError("Penetration must be above 0 and at most 1")
+        self.rng = rng
+        self.numberOfDecks = number_of_decks
+        self.penetration = penetration
+
+        # every card is stored as suit * NUMBER_OF_CARDS + card, as indexed in Hand.suit and Hand.card
+        self.deck = np.tile(np.arange(NUMBER_OF_SUITS * NUMBER_OF_CARDS, dtype=np.int8), number_of_decks)
+        self.size = len(self.deck)
+        self.cutCard = max(1, int(self.size * penetration))
+        self.shuffles = 0
+        self.shuffle()
+
+    def shuffle(self):
+        """ Put every card back and shuffle the shoe """
+        suits, cards = np.divmod(self.rng.generator.permutation(self.deck), NUMBER_OF_CARDS)
+        self.suits = suits.tolist()
+        self.cards = cards.tolist()
+        # running count after every number of cards dealt
+        self.counts = [0] + np.cumsum(HI_LO[cards]).tolist()
+        self.cursor = 0
+        self.shuffles += 1
+
+    def start_game(self):
+        """ Called before every game, reshuffles once the cut card has been reached """
+        if self.cursor >= self.cutCard:
+            self.shuffle()
+
+    def draw(self):
+        """
+        Deal the next card
+        :return: suit index and card index, as indexed in Hand.suit and Hand.card
+        """
+        if self.cursor >= self.size:
+            self.shuffle()
+        cursor = self.cursor
+        self.cursor = cursor + 1
+        return self.suits[cursor], self.cards[cursor]
+
+    def card(self):
+        """
+        Deal the next card when only its rank matters
+        :return: card index, as indexed in Hand.card
+        """
+        if self.cursor >= self.size:
+            self.shuffle()
+        cursor = self.cursor
+        self.cursor = cursor + 1
+        return self.cards[cursor]
+
+    def cards_left(self):
+        """ Returns the number of cards not dealt yet """
+        return self.size - self.cursor
+
+    def running_count(self):
+        """ Returns the Hi-Lo count of the cards dealt since the last shuffle """
+        return self.counts[self.cursor]
+
+    def true_count(self):
+        """ Returns the running count per deck left in the shoe """
+        return self.running_count() * 52 / max(self.cards_left(), 1)
@@ -0,0 +1,269 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Solver computes exact values of the Model's game with dynamic programming,
+# using that every card is drawn with replacement from the 13 ranks
+
+import functools
+import numpy as np
+import BatchModel
+import Evaluator
+import StateIndex
+
+# the dynamic programming works on maps of the get_state_rl() layout, indexed by the models' states directly,
+# optimal_q and policy_q convert their results to the dense layout of the Controller's maps
+MAP_SIZE = 130
+DEALER_SIZE = 12
+ACTIONS = [0, 1, 2]
+HIT, STAND, DOUBLE_DOWN = ACTIONS
+
+# every card rank is equally likely
+CARD_VALUES = [int(value) for value in BatchModel.CARD_VALUES]
+CARD_PROBABILITY = 1.0 / len(CARD_VALUES)
+
+# dealer outcomes are a final total of 17 to 21, or bust in the last column
+DEALER_TOTALS = [17, 18, 19, 20, 21]
+DEALER_BUST = len(DEALER_TOTALS)
+
+# extra row of the value maps used for a busted player hand
+BUST_ROW = MAP_SIZE
+
+# player states, hard 2 to 21 and 2 to 21 with a usable ace, and dealer upcards
+PLAYER_STATES = list(range(2, 22)) + list(range(102, 122))
+UPCARDS = list(range(2, 12))
+
+
+def add_card_value(hand_sum, aces, value):
+    """
+    Add a card to a hand the same way Hand.update_sum does
+    :param hand_sum: current sum of the hand
+    :param aces: number of aces counted as 11
+    :param value: value of the new card, 11 for an ace
+    :return: the new sum and number of aces counted as 11
+    """
+    hand_sum += value
+    if value == 11:
+        aces += 1
+    while hand_sum > 21 and aces > 0:
+        hand_sum -= 10
+        aces -= 1
+    return hand_sum, aces
+
+
+def player_element(hand_sum, aces):
+    """ Returns the get_state_rl() player element of a hand, or BUST_ROW if the hand is bust """
+    if hand_sum > 21:
+        return BUST_ROW
+    return hand_sum + (100 if aces > 0 else 0)
+
+
+@functools.lru_cache(maxsize=None)
+def dealer_outcomes():
+    """
+    Compute the distribution of the dealer's final total for every upcard. The dealer always draws a second card,
+    then hits on <17 and stands on every 17 like Model.do_dealer_action
+    :return: array indexed [upcard][outcome] with DEALER_TOTALS then bust as outcomes, rows 2 to 11 filled
+    """
+    @functools.lru_cache(maxsize=None)
+    def finish(hand_sum, aces):
+        outcome = np.zeros(len(DEALER_TOTALS) + 1)
+        if hand_sum > 21:
+            outcome[DEALER_BUST] = 1.0
+        elif hand_sum >= 17:
+            outcome[hand_sum - 17] = 1.0
+        else:
+            for value in CARD_VALUES:
+                outcome += CARD_PROBABILITY * finish(*add_card_value(hand_sum, aces, value))
+        return outcome
+
+    table = np.zeros((DEALER_SIZE, len(DEALER_TOTALS) + 1))
+    for upcard in UPCARDS:
+        aces = 1 if upcard == 11 else 0
+        for value in CARD_VALUES:
+            table[upcard] += CARD_PROBABILITY * finish(*add_card_value(upcard, aces, value))
+    return table
+
+
+def stand_reward(player_sum, outcomes, multiplier=1):
+    """
+    Expected reward of a finished player hand, with the same rules as Model.get_reward
+    :param player_sum: final sum of the player's hand, not bust
+    :param outcomes: dealer outcome distribution of the upcard
+    :param multiplier: 2 if the player has doubled down, otherwise 1
+    :return: expected reward
+    """
+    # 21 pays 1.5 unless the dealer also has 21
+    if player_sum == 21:
+        return 1.5 * multiplier * (1.0 - outcomes[DEALER_TOTALS.index(21)])
+
+    reward = multiplier * outcomes[DEALER_BUST]
+    for index, dealer_total in enumerate(DEALER_TOTALS):
+        if dealer_total == 21 or dealer_total > player_sum:
+            reward -= multiplier * outcomes[index]
+        elif dealer_total < player_sum:
+            reward += multiplier * outcomes[index]
+    return reward
+
+
+@functools.lru_cache(maxsize=None)
+def _model():
+    """
+    Precompute the parts of the game that do not depend on the policy
+    :return: next player element for every [element][card], and the stand and double-down rewards
+    """
+    outcomes = dealer_outcomes()
+    next_element = np.full((MAP_SIZE, len(CARD_VALUES)), BUST_ROW, dtype=np.int64)
+    stand = np.zeros((MAP_SIZE, DEALER_SIZE))
+    double_down = np.zeros((MAP_SIZE, DEALER_SIZE))
+
+    for element in PLAYER_STATES:
+        hand_sum, aces = (element - 100, 1) if element > 100 else (element, 0)
+        for card, value in enumerate(CARD_VALUES):
+            next_element[element, card] = player_element(*add_card_value(hand_sum, aces, value))
+
+        for upcard in UPCARDS:
+            stand[element, upcard] = stand_reward(hand_sum, outcomes[upcard])
+
+            # double down draws exactly one card, then the hand is finished
+            for card in range(len(CARD_VALUES)):
+                following = next_element[element, card]
+                if following == BUST_ROW:
+                    double_down[element, upcard] -= 2 * CARD_PROBABILITY
+                else:
+                    following_sum = following - 100 if following > 100 else following
+                    double_down[element, upcard] += \
+                        CARD_PROBABILITY * stand_reward(following_sum, outcomes[upcard], multiplier=2)
+    return next_element, stand, double_down
+
+
+def action_values(values):
+    """
+    One step of dynamic programming: the value of every action given the values of the following states
+    :param values: state values indexed [player][dealer]
+    :return: Q map shaped (MAP_SIZE, DEALER_SIZE, len(ACTIONS))
+    """
+    next_element, stand, double_down = _model()
+
+    # a busted hand loses the bet
+    extended = np.vstack([values, np.full((1, DEALER_SIZE), -1.0)])
+
+    q = np.zeros((MAP_SIZE, DEALER_SIZE, len(ACTIONS)))
+    q[:, :, HIT] = CARD_PROBABILITY * extended[next_element].sum(axis=1)
+    q[:, :, STAND] = stand
+    q[:, :, DOUBLE_DOWN] = double_down
+
+    # only real states have values
+    mask = np.zeros((MAP_SIZE, DEALER_SIZE), dtype=bool)
+    mask[np.ix_(PLAYER_STATES, UPCARDS)] = True
+    q[~mask] = 0.0
+    return q
+
+
+def value_iteration(select, tolerance=1e-12, max_sweeps=1000):
+    """
+    Sweep the state values until they stop changing
+    :param select: function mapping a Q map to state values, e.g. the max over actions
+    :return: the final Q map
+    """
+    values = np.zeros((MAP_SIZE, DEALER_SIZE))
+    for sweep in range(max_sweeps):
+        q = action_values(values)
+        new_values = select(q)
+        if np.max(np.abs(new_values - values)) < tolerance:
+            break
+        values = new_values
+    return q
+
+
+@functools.lru_cache(maxsize=None)
+def _optimal_q():
+    """ Cached optimal Q map """
+    return value_iteration(lambda q: q.max(axis=2))
+
+
+def optimal_q():
+    """
+    Compute the optimal Q map of the game
+    :return: Q map of the dense layout, zero in the terminal row
+    """
+    return StateIndex.dense_table(_optimal_q())
+
+
+def policy_q(policy):
+    """
+    Compute the exact Q map of a policy, which plays the greedy action of its map like Evaluator does
+    :param policy: policy map P
+    :return: Q map of the dense layout, zero in the terminal row
+    """
+    return StateIndex.dense_table(_policy_q(policy))
+
+
+def _policy_q(policy):
+    """ Exact Q map of a policy in the get_state_rl() layout """
+    action_table = Evaluator.greedy_action_table(policy)
+    return value_iteration(lambda q: np.take_along_axis(q, action_table[:, :, None], axis=2)[:, :, 0])
+
+
+def starting_states():
+    """
+    Probability of every state a game can start in
+    :return: array indexed [player][dealer]
+    """
+    probability = np.zeros((MAP_SIZE, DEALER_SIZE))
+    for dealer_value in CARD_VALUES:
+        for first_value in CARD_VALUES:
+            for second_value in CARD_VALUES:
+                element = player_element(*add_card_value(*add_card_value(0, 0, first_value), second_value))
+                probability[element, dealer_value] += CARD_PROBABILITY ** 3
+    return probability
+
+
+def expected_reward(policy=None, q=None):
+    """
+    Compute the exact expected reward of one game
+    :param policy: policy map P, played greedily
+    :param q: Q map, of the dense or the get_state_rl() layout, to play greedily instead of a policy, defaults to
+              the optimal Q when neither is given
+    :return: expected reward per game
+    """
+    if policy is not None:
+        action_table = Evaluator.greedy_action_table(policy)
+        q = _policy_q(policy)
+    else:
+        q = _optimal_q() if q is None else StateIndex.legacy_table(np.asarray(q))
+        action_table = q.argmax(axis=2)
+    values = np.take_along_axis(q, action_table[:, :, None], axis=2)[:, :, 0]
+    return float((starting_states() * values).sum())
+
+
+def reachable_states():
+    """
+    Find the states a real game (without exploring starts) can reach
+    :return: boolean array indexed [player][dealer]
+    """
+    next_element, stand, double_down = _model()
+    reachable = np.zeros(MAP_SIZE + 1, dtype=bool)
+    frontier = np.flatnonzero(starting_states().sum(axis=1) > 0)
+    while len(frontier) > 0:
+        reachable[frontier] = True
+        following = np.unique(next_element[frontier])
+        following = following[following != BUST_ROW]
+        frontier = following[~reachable[following]]
+
+    mask = np.zeros((MAP_SIZE, DEALER_SIZE), dtype=bool)
+    mask[np.ix_(np.flatnonzero(reachable[:MAP_SIZE]), UPCARDS)] = True
+    return mask
+
+
+def policy_agreement(policy):
+    """
+    Check a learned policy against the optimal one
+    :param policy: policy map P
+    :return: fraction of reachable states where the policy's greedy action is an optimal action
+    """
+    q = _optimal_q()
+    action_table = Evaluator.greedy_action_table(policy)
+    chosen = np.take_along_axis(q, action_table[:, :, None], axis=2)[:, :, 0]
+    optimal = np.abs(q.max(axis=2) - chosen) < 1e-9
+    mask = reachable_states()
+    return float(optimal[mask].mean())
@@ -0,0 +1,86 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# StateIndex maps the get_state_rl() states onto dense rows and columns of the Controller's maps
+
+import numpy as np
+
+# layout of get_state_rl(): player sum, plus 100 with a usable ace, by the dealer's upcard
+LEGACY_MAP_SIZE = 130
+LEGACY_DEALER_SIZE = 12
+
+# dense rows: hard totals 2 to 21, then soft totals 2 to 21, then one row for every other state, e.g. a bust
+PLAYER_SUMS = list(range(2, 22))
+TERMINAL_ROW = 2 * len(PLAYER_SUMS)
+NUMBER_OF_ROWS = TERMINAL_ROW + 1
+
+# dense columns: the dealer's upcards 2 to 11
+UPCARDS = list(range(2, 12))
+NUMBER_OF_COLUMNS = len(UPCARDS)
+
+# legacy player element of every dense row, None for the terminal row
+ELEMENTS = PLAYER_SUMS + [player_sum + 100 for player_sum in PLAYER_SUMS] + [None]
+
+# dense row of every legacy player element, and dense column of every upcard, as lists for scalar lookups
+ROW = [TERMINAL_ROW] * LEGACY_MAP_SIZE
+for _row, _element in enumerate(ELEMENTS[:TERMINAL_ROW]):
+    ROW[_element] = _row
+COLUMN = [None] * LEGACY_DEALER_SIZE
+for _column, _upcard in enumerate(UPCARDS):
+    COLUMN[_upcard] = _column
+
+
+def dense_state(state):
+    """
+    Map a get_state_rl() state to the Controller's maps
+    :param state: (player element, dealer upcard)
+    :return: (row, column)
+    """
+    return ROW[state[0]], COLUMN[state[1]]
+
+
+def hand_of_row(row):
+    """
+    Describe a dense row
+    :param row: row of a dense map
+    :return: (player sum, True if the hand has a usable ace), None for the terminal row
+    """
+    element = ELEMENTS[row]
+    if element is None:
+        return None
+    return (element - 100, True) if element > 100 else (element, False)
+
+
+def is_dense(table):
+    """ Returns True if a map has the dense layout, False if it has the get_state_rl() layout """
+    return np.shape(table)[:2] == (NUMBER_OF_ROWS, NUMBER_OF_COLUMNS)
+
+
+def dense_table(table):
+    """
+    Convert a map of the get_state_rl() layout, like the pickled policies, to the dense layout
+    :param table: array indexed [player element][upcard], maps already dense are returned as they are
+    :return: array indexed [row][column], with zeros in the terminal row
+    """
+    table = np.asarray(table)
+    if is_dense(table):
+        return table
+    if table.shape[:2] != (LEGACY_MAP_SIZE, LEGACY_DEALER_SIZE):
+        raise ValueError("Unknown map layout " + str(table.shape))
+    dense = np.zeros((NUMBER_OF_ROWS, NUMBER_OF_COLUMNS) + table.shape[2:], dtype=table.dtype)
+    dense[:TERMINAL_ROW] = table[np.ix_(ELEMENTS[:TERMINAL_ROW], UPCARDS)]
+    return dense
+
+
+def legacy_table(table):
+    """
+    Convert a dense map to the get_state_rl() layout, so it can be indexed by the models' states directly
+    :param table: array indexed [row][column], maps already of the get_state_rl() layout are returned as they are
+    :return: array indexed [player element][upcard], with zeros in every state that has no dense row
+    """
+    table = np.asarray(table)
+    if not is_dense(table):
+        return table
+    legacy = np.zeros((LEGACY_MAP_SIZE, LEGACY_DEALER_SIZE) + table.shape[2:], dtype=table.dtype)
+    legacy[np.ix_(ELEMENTS[:TERMINAL_ROW], UPCARDS)] = table[:TERMINAL_ROW]
+    return legacy
@@ -0,0 +1,189 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Sweep trains a grid of Controller configurations across a process pool, evaluating every
+# run at each iteration milestone of one continuing training instead of retraining per budget
+
+import argparse
+import itertools
+import multiprocessing
+import sys
+import Arguments
+import Model
+import Controller
+import Evaluator
+import PolicyServer
+import RandomStream
+import ResultSink
+
+def iteration_milestones(lower_bound, upper_bound, iteration_step, iteration_step_amount):
+    """
+    List the iteration budgets ResultDataWriter steps through
+    :param lower_bound: first budget
+    :param upper_bound: last allowed budget
+    :param iteration_step: "*" or "+"
+    :param iteration_step_amount: amount every budget is multiplied by or increased by
+    :return: increasing list of budgets
+    """
+    milestones = []
+    while lower_bound <= upper_bound:
+        milestones.append(lower_bound)
+        if iteration_step == "*":
+            following = lower_bound * iteration_step_amount
+        elif iteration_step == "+":
+            following = lower_bound + iteration_step_amount
+        else:
+            raise ValueError("Iteration step operator must be * or +")
+        if following <= lower_bound:
+            raise ValueError("Iteration steps must increase the number of iterations")
+        lower_bound = following
+    return milestones
+
+
+def grid(aitypes, action_selectors, alphas, gammas, selector_parameters, use_average_updates, n_steps=(1,),
+         update_batches=(1,)):
+    """
+    Build every combination of the given Controller parameters
+    :return: list of dictionaries of Controller keyword arguments
+    """
+    return [{"aitype": aitype,
+             "action_selector": action_selector,
+             "ai_parameter_1": alpha,
+             "ai_parameter_2": gamma,
+             "selector_parameter": selector_parameter,
+             "use_average_update": use_average_update,
+             "n_step": n_step,
+             "update_batch": update_batch}
+            for aitype, action_selector, alpha, gamma, selector_parameter, use_average_update, n_step, update_batch
+            in itertools.product(aitypes, action_selectors, alphas, gammas, selector_parameters,
+                                 use_average_updates, n_steps, update_batches)]
+
+
+def result_row(config, run_id, iterations, controller, result):
+    """ Flatten one evaluation into a row with the configuration and the ResultSink.CURVE_FIELDS """
+    row = dict(config)
+    row.update(ResultSink.curve_record(run_id, iterations, result, controller.episodesPlayed, controller.convergedAt))
+    return row
+
+
+def train_with_milestones(config, milestones, total_games, seed=None, check_for_convergence=False, verbose=False,
+                          run_id=None):
+    """
+    Train one Controller once through every milestone, and evaluate its policy at each
+    :param config: dictionary of Controller keyword arguments
+    :param milestones: increasing list of iteration budgets
+    :param total_games: number of games every evaluation plays
+    :param seed: seed of the run, an integer or SeedSequence
+    :param check_for_convergence: stop training once the policy has converged, later milestones reuse its policy
+    :param verbose: print progress
+    :param run_id: id the rows are recorded under
+    :return: the trained Controller and a list of result rows
+    """
+    rng = RandomStream.RandomStream(seed)
+    c = Controller.Controller(model=Model.Model(rng),
+                              num_iterations=0,
+                              check_for_convergence=check_for_convergence,
+                              verbose=verbose,
+                              rng=rng,
+                              **config)
+    rows = []
+
+    def evaluate(iteration, policy, values):
+        if verbose:
+            print("Testing the policy that came from  ", iteration, " iterations")
+        evaluation_seed = rng.spawn(1)[0].seedSequence
+        result = Evaluator.evaluate_policy(policy, total_games, seed=evaluation_seed)
+        rows.append(result_row(config, run_id, iteration, c, result))
+
+    # pool workers can't start an evaluation process of their own, so each checkpoint is evaluated in place
+    c.learn(max(milestones), checkpoints=milestones, callback=evaluate)
+    return c, rows
+
+
+def run_job(job):
+    """
+    Pool worker running one configuration, writing its results to the sink directory if there is one
+    :return: the result rows
+    """
+    config, milestones, total_games, seed, check_for_convergence, output, file_format, sweep_seed = job
+    run_id = ResultSink.new_run_id()
+    c, rows = train_with_milestones(config, milestones, total_games, seed, check_for_convergence, run_id=run_id)
+
+    # every worker appends to the same files, the sink locks them while it writes
+    if output is not None:
+        with ResultSink.ResultSink(output, file_format=file_format) as sink:
+            metadata = dict(config)
+            metadata.update({"run_id": run_id,
+                             "lower_bound": min(milestones),
+                             "upper_bound": max(milestones),
+                             "games": total_games,
+                             "seed": sweep_seed})
+            sink.write_metadata(metadata)
+            for row in rows:
+                sink.write_curve({field: row[field] for field in ResultSink.CURVE_FIELDS})
+            sink.write_policy(run_id, c.episodesPlayed, PolicyServer.PolicyServer(c.Q))
+    return rows
+
+
+def run_sweep(configs, milestones, total_games, workers=1, seed=None, check_for_convergence=False, output=None,
+              file_format="csv"):
+    """
+    Run every configuration across a process pool
+    :param configs: list of dictionaries of Controller keyword arguments
+    :param milestones: increasing list of iteration budgets
+    :param total_games: number of games every evaluation plays
+    :param workers: number of processes
+    :param seed: seed of the sweep, every configuration gets an independent stream from it
+    :param check_for_convergence: stop training a configuration once its policy has converged
+    :param output: optional ResultSink directory every configuration's results are written to
+    :param file_format: "csv" or "parquet"
+    :return: list of result rows, in the order of configs then milestones
+    """
+    seeds = [stream.seedSequence for stream in RandomStream.RandomStream(seed).spawn(len(configs))]
+    jobs = [(config, milestones, total_games, seeds[index], check_for_convergence, output, file_format, seed)
+            for index, config in enumerate(configs)]
+
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(run_job, jobs, chunksize=1)
+    else:
+        results = [run_job(job) for job in jobs]
+    return [row for rows in results for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and evaluate a grid of Controller configurations")
+    parser.add_argument("--aitype", nargs="+", default=["MC"], choices=["MC", "SARSA", "ESARSA", "QL"])
+    parser.add_argument("--action-selector", nargs="+", default=["EPS"], choices=["EPS", "UCB"])
+    parser.add_argument("--alpha", nargs="+", type=float, default=[0.1], help="MC step size / alpha values")
+    parser.add_argument("--gamma", nargs="+", type=float, default=[1.0], help="discount factors")
+    parser.add_argument("--selector-parameter", nargs="+", type=float, default=[0.15],
+                        help="epsilon values for EPS, c values for UCB")
+    parser.add_argument("--use-average-update", nargs="+", type=Arguments.parse_bool, default=[True])
+    parser.add_argument("--n-step", nargs="+", type=int, default=[1], help="rewards added up before bootstrapping")
+    parser.add_argument("--update-batch", nargs="+", type=int, default=[1],
+                        help="games whose updates are applied together")
+    parser.add_argument("--start", type=int, required=True, help="iterations of the first milestone")
+    parser.add_argument("--stop", type=int, required=True, help="largest allowed milestone")
+    parser.add_argument("--step-op", choices=["*", "+"], default="*", help="iteration step operator")
+    parser.add_argument("--step", type=int, default=10, help="iteration step argument")
+    parser.add_argument("--games", type=int, default=100000, help="games played at every milestone")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--check-for-convergence", action="store_true")
+    parser.add_argument("--output", default="sweep_results",
+                        help="directory the metadata, curve and policy results are appended to")
+    parser.add_argument("--format", choices=ResultSink.FORMATS, default="csv", help="format of the result files")
+    args = parser.parse_args(argv)
+
+    configs = grid(args.aitype, args.action_selector, args.alpha, args.gamma, args.selector_parameter,
+                   args.use_average_update, args.n_step, args.update_batch)
+    milestones = iteration_milestones(args.start, args.stop, args.step_op, args.step)
+    rows = run_sweep(configs, milestones, args.games, args.workers, args.seed, args.check_for_convergence,
+                     args.output, args.format)
+    print("Wrote", len(rows), "rows for", len(configs), "configurations to", args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
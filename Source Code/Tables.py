@@ -0,0 +1,80 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Tables module which holds the numpy-backed value, policy and count maps
+
+import numpy as np
+
+# two action values closer than this are treated as a tie
+TIE_TOLERANCE = 0.0001
+
+# N starts every state-action at this count, so N - INITIAL_COUNT is the number of real visits
+INITIAL_COUNT = 1
+
+
+def value_table(map_size, dealer_size, num_actions, fill=0.0):
+    """
+    Create an action-value map such as Q
+    :param map_size: number of player states
+    :param dealer_size: number of dealer states
+    :param num_actions: number of actions
+    :param fill: initial value of every entry
+    :return: float64 array shaped (map_size, dealer_size, num_actions)
+    """
+    return np.full((map_size, dealer_size, num_actions), fill, dtype=np.float64)
+
+
+def policy_table(map_size, dealer_size, num_actions):
+    """
+    Create a uniformly random policy map such as P
+    :return: float64 array shaped (map_size, dealer_size, num_actions)
+    """
+    return value_table(map_size, dealer_size, num_actions, 1.0 / num_actions)
+
+
+def count_table(map_size, dealer_size, num_actions, fill=INITIAL_COUNT):
+    """
+    Create a visit-count map such as N
+    :return: int64 array shaped (map_size, dealer_size, num_actions)
+    """
+    return np.full((map_size, dealer_size, num_actions), fill, dtype=np.int64)
+
+
+def as_table(table):
+    """
+    Convert a map to a float64 array, so that legacy nested-list maps
+    (e.g. the pickled policies) can be used like the numpy ones
+    :param table: nested list or array
+    :return: float64 array
+    """
+    return np.asarray(table, dtype=np.float64)
+
+
+def best_actions(values):
+    """
+    Find the best actions along the last axis, treating values within
+    TIE_TOLERANCE of the maximum as ties
+    :param values: array of action values, actions on the last axis
+    :return: boolean mask of the same shape, True for every best action
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.abs(values.max(axis=-1, keepdims=True) - values) < TIE_TOLERANCE
+
+
+def greedy_policy(values):
+    """
+    Build the policy which splits probability equally between the best actions
+    :param values: array of action values, actions on the last axis
+    :return: array of the same shape with 1/num_best_actions for the best actions and 0 elsewhere
+    """
+    mask = best_actions(values)
+    return mask / mask.sum(axis=-1, keepdims=True)
+
+
+def greedy_actions(policy):
+    """
+    Pick the action to play in every state, using the first highest entry like the evaluation loop does
+    :param policy: policy (or value) map, actions on the last axis
+    :return: integer array of actions with the action axis removed
+    """
+    return np.asarray(policy).argmax(axis=-1)
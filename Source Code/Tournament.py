@@ -0,0 +1,145 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Tournament plays several policies on the same games and compares them pairwise with common random numbers
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import numpy as np
+import BatchModel
+import Evaluator
+import PolicyServer
+import RandomStream
+
+
+def action_table(policy):
+    """
+    Get the action table a policy is played with
+    :param policy: PolicyServer, or a policy or value map of the dense or the get_state_rl() layout
+    :return: integer array of actions indexed [player][dealer] by get_state_rl() state
+    """
+    if isinstance(policy, PolicyServer.PolicyServer):
+        return policy.table.reshape(policy.mapSize, policy.dealerSize)
+    return Evaluator.greedy_action_table(policy)
+
+
+def compare(first, second, difference, games, confidence=0.95):
+    """
+    Build the paired comparison of two policies from running totals
+    :param first: (reward sum, reward square sum) of the first policy
+    :param second: (reward sum, reward square sum) of the second policy
+    :param difference: (sum, square sum) of the per game reward differences, first - second
+    :param games: number of games both policies played
+    :return: dictionary with the mean difference, its standard error and confidence interval, and the standard
+             error the same number of independent games would have had
+    """
+    difference_sum, difference_square_sum = difference
+    n = games
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    def variance(total, square_total):
+        return max(square_total / n - (total / n) ** 2, 0.0) * n / max(n - 1, 1)
+
+    mean_difference = difference_sum / n
+    standard_error = math.sqrt(variance(difference_sum, difference_square_sum) / n)
+    independent_error = math.sqrt((variance(*first) + variance(*second)) / n)
+
+    return {"mean_difference": mean_difference,
+            "standard_error": standard_error,
+            "difference_ci": (mean_difference - z * standard_error, mean_difference + z * standard_error),
+            "independent_standard_error": independent_error,
+            # how many times more independent games the same standard error would take
+            "variance_reduction": (independent_error / standard_error) ** 2 if standard_error > 0 else math.inf}
+
+
+def play_tournament(policies, n_games, seed=None, batch_size=100000, confidence=0.95):
+    """
+    Play every policy greedily on the same n_games games. Each batch of games is dealt once with card_streams and
+    replayed by every policy, so a game only differs between policies where their actions differ
+    :param policies: dictionary of name to PolicyServer or policy map
+    :param n_games: number of games every policy plays
+    :param seed: optional seed for the card draws
+    :param batch_size: number of games played at once
+    :param confidence: confidence level of the returned intervals
+    :return: dictionary with the result of every policy, as returned by Evaluator.evaluate_policy, and the
+             comparison of every pair of policies, as returned by compare, keyed by (first name, second name)
+    """
+    names = list(policies)
+    tables = [action_table(policies[name]) for name in names]
+    rng = RandomStream.RandomStream(seed)
+
+    wins = np.zeros(len(names), dtype=np.int64)
+    draws = np.zeros(len(names), dtype=np.int64)
+    losses = np.zeros(len(names), dtype=np.int64)
+    reward_sums = np.zeros(len(names))
+    # sum over the games of reward_i * reward_j, from which the square sums of every difference follow
+    reward_products = np.zeros((len(names), len(names)))
+
+    played = 0
+    while played < n_games:
+        size = min(batch_size, n_games - played)
+        model = BatchModel.BatchModel(size, rng, cards=BatchModel.card_streams(size, rng))
+
+        rewards = np.array([Evaluator.play_batch(table, model) for table in tables])
+        wins += np.count_nonzero(rewards > 0, axis=1)
+        draws += np.count_nonzero(rewards == 0, axis=1)
+        losses += np.count_nonzero(rewards < 0, axis=1)
+        reward_sums += rewards.sum(axis=1)
+        reward_products += rewards @ rewards.T
+        played += size
+
+    results = {}
+    for i, name in enumerate(names):
+        results[name] = Evaluator.summarize(int(wins[i]), int(draws[i]), int(losses[i]), float(reward_sums[i]),
+                                            float(reward_products[i, i]), confidence)
+
+    pairs = {}
+    for i, first in enumerate(names):
+        for j in range(i + 1, len(names)):
+            difference = (reward_sums[i] - reward_sums[j],
+                          reward_products[i, i] + reward_products[j, j] - 2 * reward_products[i, j])
+            pairs[(first, names[j])] = compare((reward_sums[i], reward_products[i, i]),
+                                               (reward_sums[j], reward_products[j, j]),
+                                               difference, n_games, confidence)
+
+    return {"games": n_games, "results": results, "pairs": pairs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play saved policies on the same games and compare their rewards")
+    parser.add_argument("policies", nargs="+", help="policy files, from Controller.save or legacy .dat pickles")
+    parser.add_argument("--games", type=int, default=1000000, help="games every policy plays")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--batch-size", type=int, default=100000, help="games played at once")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    args = parser.parse_args(argv)
+
+    if len(set(args.policies)) != len(args.policies):
+        parser.error("every policy file can only be entered once")
+    if len(args.policies) < 2:
+        parser.error("a tournament needs at least two policies")
+
+    # name the policies by their file name, or by their whole path where two files share a name
+    names = [os.path.basename(path) for path in args.policies]
+    policies = {path if names.count(name) > 1 else name: PolicyServer.PolicyServer.from_file(path)
+                for name, path in zip(names, args.policies)}
+    tournament = play_tournament(policies, args.games, args.seed, args.batch_size, args.confidence)
+
+    for name, result in tournament["results"].items():
+        print(name, "mean reward", round(result["mean_reward"], 5), "loss rate", round(result["loss_rate"], 5))
+    for (first, second), pair in tournament["pairs"].items():
+        if pair["standard_error"] == 0:
+            print(first, "-", second, "mean reward difference", round(pair["mean_difference"], 5),
+                  "(same reward in every game)")
+            continue
+        print(first, "-", second, "mean reward difference", round(pair["mean_difference"], 5),
+              "+/-", round(pair["standard_error"], 5),
+              "(" + str(round(pair["variance_reduction"], 1)) + "x fewer games than unpaired)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
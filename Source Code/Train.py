@@ -0,0 +1,211 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# Train runs one training job from a JSON or YAML config file and command line flags, without any prompts
+
+import argparse
+import json
+import os
+import sys
+import Arguments
+
+# every setting of a training job, with its default
+DEFAULTS = {"aitype": "MC",
+            "action_selector": "EPS",
+            "ai_parameter_1": 0.1,
+            "ai_parameter_2": 1.0,
+            "selector_parameter": 0.15,
+            "use_average_update": True,
+            "n_step": 1,
+            "update_batch": 1,
+            "replay_capacity": 0,
+            "replay_batch": 32,
+            "check_for_convergence": False,
+            "lower_bound": 100000,
+            "upper_bound": 100000,
+            "iteration_step": "*",
+            "iteration_step_amount": 10,
+            "games": 100000,
+            "evaluation_batch": 100000,
+            "target_width": None,
+            "threshold": None,
+            "stop_metric": "loss_rate",
+            "workers": 1,
+            "seed": None,
+            "model": "Model",
+            "dealer_table": "none",
+            "decks": 0,
+            "penetration": 0.75,
+            "output": "results",
+            "format": "csv",
+            "save": None,
+            "verbose": False}
+
+# settings passed straight to the Controller
+CONTROLLER_KEYS = ["aitype",
+                   "action_selector",
+                   "ai_parameter_1",
+                   "ai_parameter_2",
+                   "selector_parameter",
+                   "use_average_update",
+                   "n_step",
+                   "update_batch",
+                   "replay_capacity",
+                   "replay_batch",
+                   "check_for_convergence",
+                   "verbose"]
+
+
+def load_config(path):
+    """
+    Read the settings of a job from a config file
+    :param path: .json file, or .yaml / .yml file which needs PyYAML
+    :return: dictionary of settings
+    """
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in [".yaml", ".yml"]:
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Reading " + path + " requires PyYAML, or use a JSON config")
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("Config " + path + " must hold a mapping of settings")
+    return config
+
+
+def settings_of(config):
+    """
+    Fill in the defaults of a job's settings
+    :param config: dictionary of settings, any subset of DEFAULTS
+    :return: dictionary with every setting
+    """
+    unknown = set(config) - set(DEFAULTS)
+    if unknown:
+        raise ValueError("Unknown settings: " + ", ".join(sorted(unknown)))
+    settings = dict(DEFAULTS)
+    settings.update(config)
+    return settings
+
+
+def train(config):
+    """
+    Train a Controller through every iteration milestone, evaluating the policy of each in the background, and
+    record the run with a ResultSink
+    :param config: dictionary of settings, any subset of DEFAULTS
+    :return: dictionary with the run_id, the trained controller and the curve as a list of (iteration, result)
+    """
+    settings = settings_of(config)
+
+    # imported here so that the command line starts quickly
+    import Controller
+    import Evaluator
+    import PolicyServer
+    import RandomStream
+    import ModelFactory
+    import ResultSink
+    import Sweep
+
+    rng = RandomStream.RandomStream(settings["seed"])
+    evaluation_seed = rng.spawn(1)[0].seedSequence
+    model = ModelFactory.model_factory(settings["model"], settings["dealer_table"], settings["decks"],
+                                    settings["penetration"])(rng)
+    c = Controller.Controller(model=model,
+                              num_iterations=0,
+                              num_workers=settings["workers"],
+                              rng=rng,
+                              **{key: settings[key] for key in CONTROLLER_KEYS})
+
+    milestones = Sweep.iteration_milestones(settings["lower_bound"], settings["upper_bound"],
+                                            settings["iteration_step"], settings["iteration_step_amount"])
+    curve = []
+    if settings["games"] > 0:
+        with Evaluator.BackgroundEvaluator(settings["games"],
+                                           seed=evaluation_seed,
+                                           batch_size=settings["evaluation_batch"],
+                                           target_width=settings["target_width"],
+                                           threshold=settings["threshold"],
+                                           metric=settings["stop_metric"],
+                                           decks=settings["decks"],
+                                           penetration=settings["penetration"]) as evaluator:
+            c.learn(max(milestones), checkpoints=milestones, callback=evaluator.submit)
+            curve = evaluator.results()
+    else:
+        c.learn(max(milestones))
+
+    run_id = ResultSink.new_run_id()
+    if settings["output"] is not None:
+        with ResultSink.ResultSink(settings["output"], file_format=settings["format"]) as sink:
+            metadata = {key: settings[key] for key in ResultSink.METADATA_FIELDS if key in settings}
+            metadata["run_id"] = run_id
+            sink.write_metadata(metadata)
+            for iterations, result in curve:
+                sink.write_curve(ResultSink.curve_record(run_id, iterations, result, c.episodesPlayed,
+                                                         c.convergedAt))
+            sink.write_policy(run_id, c.episodesPlayed, PolicyServer.PolicyServer(c.Q))
+
+    if settings["save"] is not None:
+        c.save(settings["save"])
+
+    return {"run_id": run_id, "controller": c, "curve": curve}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and evaluate one Controller without prompts. Flags override "
+                                                 "the settings of the config file, which override the defaults")
+    parser.add_argument("--config", help="JSON or YAML file of settings, named like the flags with underscores")
+    parser.add_argument("--aitype", choices=["MC", "SARSA", "ESARSA", "QL"])
+    parser.add_argument("--action-selector", choices=["EPS", "UCB"])
+    parser.add_argument("--ai-parameter-1", type=float, help="MC step size / alpha")
+    parser.add_argument("--ai-parameter-2", type=float, help="discount factor")
+    parser.add_argument("--selector-parameter", type=float, help="epsilon for EPS, c for UCB")
+    parser.add_argument("--use-average-update", type=Arguments.parse_bool)
+    parser.add_argument("--n-step", type=int)
+    parser.add_argument("--update-batch", type=int)
+    parser.add_argument("--replay-capacity", type=int)
+    parser.add_argument("--replay-batch", type=int)
+    parser.add_argument("--check-for-convergence", type=Arguments.parse_bool)
+    parser.add_argument("--lower-bound", type=int, help="iterations of the first milestone")
+    parser.add_argument("--upper-bound", type=int, help="largest allowed milestone")
+    parser.add_argument("--iteration-step", choices=["*", "+"], help="iteration step operator")
+    parser.add_argument("--iteration-step-amount", type=int, help="iteration step argument")
+    parser.add_argument("--games", type=int, help="games played to evaluate every milestone, 0 skips evaluation. "
+                                                  "The most played when stopping early")
+    parser.add_argument("--evaluation-batch", type=int, help="games evaluated at once, and how often the stopping "
+                                                             "targets are checked")
+    parser.add_argument("--target-width", type=float, help="stop evaluating a milestone once the confidence interval "
+                                                           "of the stop metric is at most this wide")
+    parser.add_argument("--threshold", type=float, help="stop evaluating a milestone once the stop metric is known "
+                                                        "to be above or below this value")
+    parser.add_argument("--stop-metric", choices=["loss_rate", "mean_reward"])
+    parser.add_argument("--workers", type=int, help="training processes")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--model", choices=["Model", "FastModel"])
+    parser.add_argument("--dealer-table", choices=["none", "sample", "expected"])
+    parser.add_argument("--decks", type=int, help="decks of the shoe training and evaluation deal from, 0 for an "
+                                                  "infinite deck")
+    parser.add_argument("--penetration", type=float, help="fraction of the shoe dealt before reshuffling")
+    parser.add_argument("--output", help="ResultSink directory of the results")
+    parser.add_argument("--format", choices=["csv", "parquet"])
+    parser.add_argument("--save", help="file the trained maps are saved to with PolicyStore")
+    parser.add_argument("--verbose", type=Arguments.parse_bool)
+    args = vars(parser.parse_args(argv))
+
+    try:
+        config = load_config(args.pop("config")) if args.get("config") else {}
+        config.update({key: value for key, value in args.items() if key != "config" and value is not None})
+        run = train(config)
+    except ValueError as error:
+        parser.error(str(error))
+
+    for iterations, result in run["curve"]:
+        print("iterations", iterations, "loss rate", result["loss_rate"], "mean reward", result["mean_reward"],
+              "games", result["games"])
+    print("Finished run", run["run_id"], "after", run["controller"].episodesPlayed, "iterations")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# UCBSelector chooses Upper Confidence Bound actions from exploration bonuses kept up to date as states are visited
+
+import math
+import numpy as np
+import Tables
+
+# ln t is only recomputed once t has grown by this factor, between those times it moves by less than ln 1.05
+LOG_T_GROWTH = 1.05
+
+
+class UCBSelector:
+    """
+    This class keeps the exploration bonus c * sqrt(ln t / N) of every state-action of a Controller in an array
+    shaped like N. A visit only recomputes the bonus of the state-action it counted, and the whole array is only
+    recomputed when t has grown by LOG_T_GROWTH, so choosing an action is one addition and argmax over its state.
+    Actions never tried in a state have an infinite bonus, they are chosen first
+
+    Constructor takes:
+    controller = Controller whose Q, N, t and rng are used, every visit it counts must also be passed to visit()
+    c = exploration constant
+    """
+
+    def __init__(self, controller, c):
+        """ Constructor """
+        self.controller = controller
+        self.c = c
+        self.rebuild()
+
+    def rebuild(self):
+        """ Recompute every bonus from N and t, needed when N is changed without going through visit """
+        t = self.controller.t
+        self.logT = math.log(t)
+        self.nextT = max(t + 1, math.ceil(t * LOG_T_GROWTH))
+
+        # N starts at Tables.INITIAL_COUNT, the bonus is over the visits actually made
+        visits = self.controller.N - Tables.INITIAL_COUNT
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.bonus = np.where(visits > 0, self.c * np.sqrt(self.logT / visits), np.inf)
+        # number of actions not tried yet in every state
+        self.untried = np.count_nonzero(visits == 0, axis=-1)
+
+    def visit(self, player_hand, dealer_hand, action):
+        """
+        Update the bonus of a state-action the Controller has just counted in N
+        :param player_hand:
+        :param dealer_hand:
+        :param action:
+        :return: None
+        """
+        visits = self.controller.N[player_hand, dealer_hand, action] - Tables.INITIAL_COUNT
+        if visits == 1:
+            self.untried[player_hand, dealer_hand] -= 1
+        self.bonus[player_hand, dealer_hand, action] = self.c * math.sqrt(self.logT / visits)
+
+    def select(self, state):
+        """
+        Choose the action with the highest upper confidence bound, at random among ties
+        :param state: (row, column) of the Controller's maps
+        :return: action
+        """
+        if self.controller.t >= self.nextT:
+            self.rebuild()
+        player_hand, dealer_hand = state
+        bonus = self.bonus[player_hand, dealer_hand]
+
+        # a state has only a few actions, so they are compared as python floats rather than numpy arrays
+        if self.untried[player_hand, dealer_hand]:
+            max_actions = [action for action, value in enumerate(bonus.tolist()) if value == math.inf]
+        else:
+            values = (self.controller.Q[player_hand, dealer_hand] + bonus).tolist()
+            best = max(values)
+            max_actions = [action for action, value in enumerate(values) if best - value < Tables.TIE_TOLERANCE]
+
+        if len(max_actions) == 1:
+            return max_actions[0]
+        return int(self.controller.rng.choice(max_actions))
+
+    def select_batch(self, player_hands, dealer_hands):
+        """
+        Choose the upper confidence bound action of many states at once, at random among ties
+        :param player_hands: array of rows
+        :param dealer_hands: array of columns
+        :return: integer array of actions
+        """
+        if self.controller.t >= self.nextT:
+            self.rebuild()
+        bonus = self.bonus[player_hands, dealer_hands]
+        untried = np.isinf(bonus)
+
+        # in states with untried actions only those count, elsewhere the best bounds do
+        values = np.where(untried, 0.0, self.controller.Q[player_hands, dealer_hands] + bonus)
+        best = np.where(untried.any(axis=-1, keepdims=True), untried, Tables.best_actions(values))
+
+        # the best action with the highest random key is a uniform choice among the ties
+        keys = self.controller.rng.generator.random(best.shape)
+        return np.where(best, keys, -1.0).argmax(axis=-1)
@@ -0,0 +1,132 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# UpdateEngine collects the steps of many episodes and applies their value updates to Q in one batch
+
+import numpy as np
+import Tables
+
+
+class UpdateEngine:
+    """
+    This class buffers the steps of a Controller's episodes and updates Q from them with one scatter-add,
+    using n-step returns which bootstrap from the value of the state n steps later:
+    MC: the episode's return, no bootstrap
+    SARSA: Q[S'][A'] of the action taken there
+    ESARSA (Expected SARSA): the expectation of Q[S'] under the epsilon-greedy policy
+    QL: the max of Q[S']
+    A step whose n-step window reaches the end of its episode does not bootstrap
+
+    Constructor takes:
+    controller = Controller whose Q, P and N maps are updated
+    n_step = number of rewards before bootstrapping
+    batch_size = number of episodes buffered between updates
+    """
+
+    def __init__(self, controller, n_step=1, batch_size=1):
+        """ Constructor """
+        self.controller = controller
+        self.nStep = n_step
+        self.batchSize = batch_size
+        self.clear()
+
+    def clear(self):
+        """ Empty the buffer """
+        self.players = []
+        self.dealers = []
+        self.actions = []
+        self.rewards = []
+        # number of steps left in the episode of every step, counting itself
+        self.remaining = []
+        self.episodes = 0
+
+    def add_episode(self, episode):
+        """
+        Buffer the steps of an episode. Nothing is updated until flush, which the Controller calls through
+        apply_updates once the buffer is full
+        :param episode: sequence of [state, action, reward] as returned by Controller.generate_game
+        :return: None
+        """
+        length = len(episode)
+        for t, (state, action, reward) in enumerate(episode):
+            self.players.append(state[0])
+            self.dealers.append(state[1])
+            self.actions.append(action)
+            self.rewards.append(reward)
+            self.remaining.append(length - t)
+        self.episodes += 1
+
+    def is_full(self):
+        """ Returns True once batch_size episodes are buffered """
+        return self.episodes >= self.batchSize
+
+    def returns(self, players, dealers, actions, rewards, remaining):
+        """
+        Compute the n-step return of every buffered step, bootstrapping from the current maps
+        :return: array of returns
+        """
+        c = self.controller
+        gamma = 1.0 if c.AIType == "MC" else c.AIParameter2
+        n_step = int(remaining.max()) if c.AIType == "MC" else self.nStep
+
+        # discounted rewards of the next n steps of the same episode
+        targets = np.zeros(len(rewards))
+        for k in range(n_step):
+            inside = np.flatnonzero(remaining > k)
+            targets[inside] += gamma ** k * rewards[inside + k]
+        if c.AIType == "MC":
+            return targets
+
+        # the value of the state n steps later, for the steps whose episode lasts that long
+        later = np.flatnonzero(remaining > n_step)
+        following = later + n_step
+        values = c.Q[players[following], dealers[following]]
+        if c.AIType == "SARSA":
+            bootstrap = values[np.arange(len(following)), actions[following]]
+        elif c.AIType == "QL":
+            bootstrap = values.max(axis=1)
+        else:
+            policy = c.P[players[following], dealers[following]]
+            if c.ActionSelector == "EPS":
+                policy = (1 - c.SelectorParameter) * policy + c.SelectorParameter / len(c.actions)
+            bootstrap = (policy * values).sum(axis=1)
+        targets[later] += gamma ** n_step * bootstrap
+        return targets
+
+    def flush(self):
+        """
+        Apply the buffered updates. Targets of the same state-action are merged first, so every entry takes one
+        step however often the batch visited it. With the average update rule it moves to the running mean of all
+        its targets so far, otherwise it adds step size * (mean of its targets - Q[S][A]) from the value before
+        this batch
+        :return: None
+        """
+        if not self.players:
+            return
+        c = self.controller
+        players = np.array(self.players)
+        dealers = np.array(self.dealers)
+        actions = np.array(self.actions)
+        rewards = np.array(self.rewards, dtype=np.float64)
+        remaining = np.array(self.remaining)
+        self.clear()
+
+        targets = self.returns(players, dealers, actions, rewards, remaining)
+        errors = targets - c.Q[players, dealers, actions]
+
+        # add up the errors of every state-action, and count its targets
+        entries, inverse = np.unique(np.ravel_multi_index((players, dealers, actions), c.Q.shape),
+                                     return_inverse=True)
+        errors = np.bincount(inverse, weights=errors)
+        counts = np.bincount(inverse)
+        players, dealers, actions = np.unravel_index(entries, c.Q.shape)
+
+        # N already counts every buffered visit, so 1/N weights the batch's targets into the running mean
+        if c.useAverageUpdate:
+            errors /= c.N[players, dealers, actions]
+        else:
+            errors *= c.AIParameter / counts
+        c.add_q(players, dealers, actions, errors)
+
+        # greedy policy of every state touched
+        c.P[players, dealers] = Tables.greedy_policy(c.Q[players, dealers])
@@ -3,152 +3,259 @@
 # Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
 # View class, which creates the model view
 
-import pygame
-import Model
-import pickle
+import argparse
 import sys, os
 
 
 if getattr(sys, 'frozen', False):
     # If the application is run as a bundle, the pyInstaller bootloader
-    # extends the sys module by a flag frozen=True and sets the app 
+    # extends the sys module by a flag frozen=True and sets the app
     # path into variable _MEIPASS'.
      os.chdir(sys._MEIPASS)
 
-# load the policy maps
-pol_idx = 0
-pol_maps = []
+# policies that can be shown, loaded the first time they are selected
 pol_files = ['MonteCarlo', 'SARSA', 'QL']
 pol_act = ["H", "S", "D"]
-for policy_file in pol_files:
-    with open(os.path.join("assets", "policies", policy_file + ".dat"), "rb") as f:
-        p = pickle.load(f)
-    pol_maps.append(p)
 
-# tick counter
-tick = 0
+# colours
+WHITE = (255, 255, 255)
+GREEN = (0, 128, 0)
+DARK_GREEN = (0, 20, 0)
+
+# the policy grid is drawn onto its own surface, placed at this corner of the window
+GRID_LEFT = 740
+GRID_SIZE = (1366 - GRID_LEFT, 640)
+
+
+def load_policy(policy_file):
+    """
+    Load a policy compiled to a greedy action table, from the binary table or from the older pickle
+    if not converted yet
+    :param policy_file: name of the policy in assets/policies
+    :return: PolicyServer
+    """
+    import PolicyServer
+    policy_path = os.path.join("assets", "policies", policy_file)
+    if os.path.exists(policy_path + ".bin"):
+        return PolicyServer.PolicyServer.from_file(policy_path + ".bin")
+    return PolicyServer.PolicyServer.from_file(policy_path + ".dat")
+
+
+def cell_position(player_val, dealer_val):
+    """
+    Position of a policy grid cell on the grid surface
+    :param player_val: player element, 2 to 21 hard or 112 to 121 for a usable ace
+    :param dealer_val: dealer upcard, 2 to 11
+    :return: (x, y), or None if the state is not in the grid
+    """
+    if dealer_val < 2 or dealer_val > 11:
+        return None
+    if 2 <= player_val <= 21:
+        return 6 + 27 * dealer_val, player_val * 20
+    if 112 <= player_val <= 121:
+        return 6 + 27 * dealer_val, 200 + (player_val - 100) * 20
+    return None
+
+
+class Assets:
+    """
+    This class loads every image and renders every text once, converted to the display's pixel format,
+    and keeps them for the following frames
+    """
+
+    def __init__(self, pygame):
+        """ Constructor """
+        self.pygame = pygame
+        self.images = {}
+        self.texts = {}
+        self.font = pygame.font.Font(os.path.join("assets", "fonts", "LiberationSerif-Regular.ttf"), 35)
+        self.smallFont = pygame.font.Font(os.path.join("assets", "fonts", "CourierNew.ttf"), 15)
+        self.background = pygame.image.load(os.path.join("assets", "felt-bg.jpg")).convert()
+
+    def image(self, name):
+        """ Returns the surface of assets/<name>.png """
+        if name not in self.images:
+            self.images[name] = self.pygame.image.load(os.path.join("assets", name + ".png")).convert_alpha()
+        return self.images[name]
+
+    def text(self, string, small=False, background=None):
+        """ Returns the rendered surface of a string """
+        key = (string, small, background)
+        if key not in self.texts:
+            font = self.smallFont if small else self.font
+            self.texts[key] = font.render(string, False, WHITE, background)
+        return self.texts[key]
+
+
+class PolicyGrid:
+    """
+    This class keeps the policy table drawn on one surface per policy, so a frame only blits it and the
+    flashing cell of the current state
+    """
+
+    def __init__(self, pygame, assets):
+        """ Constructor """
+        self.pygame = pygame
+        self.assets = assets
+        self.policies = [None] * len(pol_files)
+        self.surfaces = [None] * len(pol_files)
+
+    def policy(self, pol_idx):
+        """ Returns the PolicyServer of a policy, loading it the first time """
+        if self.policies[pol_idx] is None:
+            self.policies[pol_idx] = load_policy(pol_files[pol_idx])
+        return self.policies[pol_idx]
+
+    def surface(self, pol_idx):
+        """ Returns the grid surface of a policy, drawing it the first time """
+        if self.surfaces[pol_idx] is None:
+            self.surfaces[pol_idx] = self.draw(self.policy(pol_idx))
+        return self.surfaces[pol_idx]
+
+    def draw(self, policy):
+        """
+        Draw the whole policy table
+        :param policy: PolicyServer of the policy
+        :return: surface of the table
+        """
+        text = self.assets.text
+        grid = self.pygame.Surface(GRID_SIZE, self.pygame.SRCALPHA)
+
+        # print policy map headers
+        grid.blit(text("Dealer's Upcard", True, GREEN), (800 - GRID_LEFT, 0))
+        grid.blit(text("2  3  4  5  6  7  8  9  T  A", True, GREEN), (800 - GRID_LEFT, 20))
+
+        # dump the policy for player states 2 through 21, and 12 through 21 with a useable ACE, against the
+        # dealer's upcards 2 through 11
+        for player_val in list(range(2, 22)) + list(range(112, 122)):
+            label = str(player_val) if player_val < 100 else "A" + str(player_val - 100)
+            x, y = cell_position(player_val, 2)
+            grid.blit(text(label, True, GREEN), (760 - GRID_LEFT, y))
+            for dealer_val in range(2, 12):
+                best_action = policy.action((player_val, dealer_val))
+                grid.blit(text(pol_act[best_action], True, DARK_GREEN), cell_position(player_val, dealer_val))
+        return grid
+
+    def blit(self, screen, pol_idx, state, tick):
+        """
+        Draw the policy table with the cell of the current state flashing
+        :param screen: surface drawn on
+        :param pol_idx: index of the policy shown
+        :param state: get_state_rl() state of the game
+        :param tick: frame counter
+        :return: None
+        """
+        screen.blit(self.surface(pol_idx), (GRID_LEFT, 0))
+        position = cell_position(state[0], state[1])
+        if position is not None:
+            best_action = self.policy(pol_idx).action((state[0], state[1]))
+            flash = (128 + (120 * (tick % 2)), 0, 0)
+            screen.blit(self.assets.text(pol_act[best_action], True, flash), (GRID_LEFT + position[0], position[1]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play Blackjack next to the learned policy tables")
+    parser.add_argument("--headless", action="store_true", help="render without opening a window")
+    parser.add_argument("--frames", type=int, default=0, help="quit after this many frames, 0 runs until quit")
+    parser.add_argument("--fps", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    # the dummy video driver has to be chosen before pygame starts
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    import pygame
+    import Model
+
+    pol_idx = 0
+
+    # tick counter
+    tick = 0
+
+    m = Model.Model()
+    running = True
+
+    # setup pygame
+    pygame.init()
+    pygame.display.set_caption("Blackjack")
+    s = pygame.display.set_mode((1366, 768))
+    c = pygame.time.Clock()
+    assets = Assets(pygame)
+    grid = PolicyGrid(pygame, assets)
+
+    while running:
+        tick += 1
+
+        # if it's not the player's turn, play out dealer hand
+        if not m.playerTurn:
+            m.do_dealer_action()
+
+        # for each event in the game
+        for event in pygame.event.get():
+
+            # if user wants to quit, let them
+            if event.type == pygame.QUIT:
+                running = False
+
+            # capture keypress
+            if event.type == pygame.KEYDOWN:
+
+                # restart game
+                if event.key == pygame.K_r:
+                    m.start()
+
+                # quit game
+                if event.key == pygame.K_ESCAPE or event.key == pygame.K_q:
+                    running = False
+
+                # hit, stand, double down
+                if event.key == pygame.K_h and m.playerTurn:
+                    m.do_player_action(0)
+                if event.key == pygame.K_s and m.playerTurn:
+                    m.do_player_action(1)
+                if event.key == pygame.K_d and m.playerTurn:
+                    m.do_player_action(2)
 
-m = Model.Model()
-running = True
+                # switch policies
+                if event.key == pygame.K_p and m.playerTurn:
+                    pol_idx = (pol_idx + 1) % len(pol_files)
 
-# setup pygame
-pygame.init()
-pygame.display.set_caption("Blackjack")
-f = pygame.font.Font(os.path.join("assets", "fonts", "LiberationSerif-Regular.ttf"), 35)
-f2 = pygame.font.Font(os.path.join("assets", "fonts", "CourierNew.ttf"), 15)
-s = pygame.display.set_mode((1366, 768))
-c = pygame.time.Clock()
+        # load background
+        s.blit(assets.background, (0, 0))
 
+        # visualize policy table, flashing the current state
+        grid.blit(s, pol_idx, m.get_state_rl(), tick)
 
-while running:
-    tick += 1
+        # draw player cards
+        for player_val in range(len(m.playerHand.hand)):
+            s.blit(assets.image(m.playerHand.hand[player_val]), (300 + 50 * player_val, 0))
 
-    # if it's not the player's turn, play out dealer hand
-    if not m.playerTurn:
-        m.do_dealer_action()
+        # draw dealer card
+        for player_val in range(len(m.dealerHand.hand)):
+            s.blit(assets.image(m.dealerHand.hand[player_val]), (300 + 50 * player_val, 250))
 
-    # for each event in the game
-    for event in pygame.event.get():
+        # scores and status line
+        s.blit(assets.text("Player is: " + str(m.playerHand.get_value())), (10, 0))
+        s.blit(assets.text("Dealer is: " + str(m.dealerHand.get_value())), (10, 250))
 
-        # if user wants to quit, let them
-        if event.type == pygame.QUIT:
+        # if the game is over, say so
+        if m.isRunning is False:
+            s.blit(assets.text("Game over, reward=" + str(m.get_reward())), (10, 600))
+
+        # print keypress menu
+        s.blit(assets.text("[Q]uit [H]it [S]tand [D]oubleDown Change[P]olicy: " + pol_files[pol_idx] +
+                           " [R]estart Game"), (10, 700))
+
+        # update the display
+        pygame.display.flip()
+
+        if args.frames and tick >= args.frames:
             running = False
 
-        # capture keypress
-        if event.type == pygame.KEYDOWN:
+        # run at 10 fps so that we see animations
+        c.tick(args.fps)
 
-            # restart game
-            if event.key == pygame.K_r:
-                m.start()
+    pygame.quit()
 
-            # quit game
-            if event.key == pygame.K_ESCAPE or event.key == pygame.K_q:
-                running = False
 
-            # hit, stand, double down
-            if event.key == pygame.K_h and m.playerTurn:
-                m.do_player_action(0)
-            if event.key == pygame.K_s and m.playerTurn:
-                m.do_player_action(1)
-            if event.key == pygame.K_d and m.playerTurn:
-                m.do_player_action(2)
-
-            # switch policies
-            if event.key == pygame.K_p and m.playerTurn:
-                pol_idx = (pol_idx + 1) % len(pol_files)
-
-    # print player and dealer values
-    player = f.render("Player is: " + str(m.playerHand.get_value()), False, (255, 255, 255))
-    dealer = f.render("Dealer is: " + str(m.dealerHand.get_value()), False, (255, 255, 255))
-
-    # load background
-    s.blit(pygame.image.load(os.path.join("assets", "felt-bg.jpg")), (0, 0))
-
-    # visualize policy table
-
-    # get the appropriate state number for the policy
-    player_policy_value = m.playerHand.get_value() + (100 if m.playerHand.number_of_aces > 0 else 0)
-
-    # print policy map headers
-    header = f2.render("Dealer's Upcard", False, (255, 255, 255), (0, 128, 0))
-    header2 = f2.render("2  3  4  5  6  7  8  9  T  A", False, (255, 255, 255), (0, 128, 0))
-    s.blit(header, (800, 0))
-    s.blit(header2, (800, 20))
-
-    # dump the policy for player states 2 through 21 corresponding the dealer 2 through 12
-    for player_val in range(2, 22):
-        # print player state
-        s.blit(f2.render(str(player_val), False, (255, 255, 255), (0, 128, 0)), (760, player_val * 20))
-
-        # print all dealer values in row
-        for dealer_val in range(2, 12):
-            # figure out best action
-            best_action = 0
-            for action_idx in range(0, len(pol_maps[pol_idx][player_val][dealer_val])):
-                if pol_maps[pol_idx][player_val][dealer_val][action_idx] > pol_maps[pol_idx][player_val][dealer_val][best_action]:
-                    best_action = action_idx
-
-            # flash background on best action
-            text_background = (128 + (120 * (tick % 2)), 0, 0) if (player_val == player_policy_value and dealer_val == m.dealerHand.get_value()) else (0,20,0)
-            s.blit(f2.render(pol_act[best_action], False, (255, 255, 255), text_background), (746 + 27 * dealer_val, player_val * 20))
-
-    # analogous to above, except 112 represents a 12 with a useable ACE
-    for player_val in range(112, 122):
-        s.blit(f2.render("A"+str(player_val-100), False, (255, 255, 255), (0, 128, 0)), (760, 200+(player_val-100) * 20))
-        for dealer_val in range(2, 12):
-            best_action = 0
-            for action_idx in range(0, len(pol_maps[pol_idx][player_val][dealer_val])):
-                if pol_maps[pol_idx][player_val][dealer_val][action_idx] > pol_maps[pol_idx][player_val][dealer_val][best_action]:
-                    best_action = action_idx
-            text_background = (128 + (120 * (tick % 2)), 0, 0) if (player_val == player_policy_value and dealer_val == m.dealerHand.get_value()) else (0,20,0)
-            s.blit(f2.render(pol_act[best_action], False, (255, 255, 255), text_background), (746 + 27 * dealer_val, 200 + (player_val - 100) * 20))
-
-    # draw player cards
-    for player_val in range(len(m.playerHand.hand)):
-        s.blit(pygame.image.load(os.path.join("assets", m.playerHand.hand[player_val] + ".png")), (300 + 50 * player_val, 0))
-
-    # draw dealer card
-    for player_val in range(len(m.dealerHand.hand)):
-        s.blit(pygame.image.load(os.path.join("assets", m.dealerHand.hand[player_val] + ".png")), (300 + 50 * player_val, 250))
-
-    # scores and status line
-    s.blit(player, (10, 0))
-    s.blit(dealer, (10, 250))
-
-    # if the game is over, say so
-    if m.isRunning is False:
-        s.blit(f.render("Game over, reward=" + str(m.get_reward()), False, (255, 255, 255)), (10, 600))
-
-    # print keypress menu
-    status = f.render(
-        "[Q]uit [H]it [S]tand [D]oubleDown Change[P]olicy: " + pol_files[pol_idx] + " [R]estart Game",
-        False, (255, 255, 255))
-    s.blit(status, (10, 700))
-
-    # update the display
-    pygame.display.flip()
-
-    # run at 10 fps so that we see animations
-    c.tick(10)
-
-pygame.quit()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Blackjack AI project
+# Authors: Steve Parson, Nabil Miri, Vineel Nagisetty
+# Made for Final Report of CS 3200 Course, taught by Dr. David Churchill
+# regression tests of the UpdateEngine's batched updates, run with python -m pytest
+
+import numpy as np
+import Controller
+import Model
+import RandomStream
+
+
+def controller(use_average_update):
+    """ Returns an untrained ESARSA Controller whose updates go through an UpdateEngine """
+    return Controller.Controller(Model.Model(RandomStream.RandomStream(1)),
+                                 aitype="ESARSA",
+                                 use_average_update=use_average_update,
+                                 ai_parameter_1=0.1,
+                                 update_batch=1000000,
+                                 num_iterations=0)
+
+
+def push_repeated(c, repeats, reward):
+    """ Buffer the same one step episode many times, counting its visits like generate_game, and flush """
+    state = (10, 5)
+    for _ in range(repeats):
+        c.visit(state[0], state[1], 1)
+        c.updateEngine.add_episode([[state, 1, reward]])
+    c.apply_updates()
+    return c.Q[state[0], state[1], 1]
+
+
+def test_repeated_keys_take_one_step():
+    # every target is 1, so a fixed step size moves Q from 0 to 0.1 however often the batch repeats it
+    c = controller(use_average_update=False)
+    assert np.isclose(push_repeated(c, 3000, 1.0), 0.1)
+    assert np.abs(c.Q).max() <= 1.0
+
+
+def test_repeated_keys_average():
+    # the average update rule moves Q to the running mean of the targets, which never leaves their range
+    c = controller(use_average_update=True)
+    value = push_repeated(c, 3000, 1.0)
+    assert 0.0 < value <= 1.0
+    value = push_repeated(c, 3000, -1.0)
+    assert -1.0 <= value < 1.0
+
+
+def test_large_batch_stays_bounded():
+    c = Controller.Controller(Model.Model(RandomStream.RandomStream(1)),
+                              aitype="ESARSA",
+                              use_average_update=False,
+                              ai_parameter_1=0.1,
+                              update_batch=3000,
+                              num_iterations=20000)
+    # rewards lie within -2 and 3, and Q can't leave that range
+    assert c.Q.min() >= -2.0 and c.Q.max() <= 3.0